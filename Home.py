@@ -1,18 +1,12 @@
 import streamlit as st
-from PIL import Image
+from curry_company.scaffold import sidebar_header
 
 st.set_page_config(
     page_title='Home',
     page_icon='🎲'
 )
 
-#image_path = 'C:\\Users\\Estefany\\Documents\\curso_python\\comunidade_ds\\analisando_dados_com_python\\alvo-de-dardos.png'
-image = Image.open('alvo-de-dardos.png')
-st.sidebar.image(image, width=120)
-
-st.sidebar.markdown('# Cury  Company')
-st.sidebar.markdown('## Fastest Delivery in Town')
-st.sidebar.markdown('''---''')
+sidebar_header()
 
 st.write('# Curry Company Growth Dashboard')
 
@@ -0,0 +1,3 @@
+""" Scripts de benchmark do dashboard. Rodar a partir da raiz do projeto,
+por exemplo: `python -m benchmarks.bench_clean_code`.
+"""
@@ -0,0 +1,102 @@
+""" Compara o `clean_code` vetorizado com a versão original, célula a célula.
+
+Uso:
+    python -m benchmarks.bench_clean_code --scales 1 10 100 1000
+
+Cada escala é uma cópia sintética do `train.csv` repetida N vezes. Para cada
+uma o script mede o tempo das duas versões, confere que as saídas são
+idênticas e imprime o ganho.
+"""
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import argparse
+import time
+
+import pandas as pd
+
+from curry_company.cleaning import clean_code
+from curry_company.data import DATA_PATH
+from curry_company.schema import compact_types
+
+# -----------------------------------
+# Funções
+# -----------------------------------
+def clean_code_legacy(df1):
+    """ Versão original do `clean_code`, mantida aqui só como referência. """
+    df1 = df1.dropna(subset=['Delivery_person_Age', 'Road_traffic_density', 'City', 'Festival', 'Weatherconditions', 'multiple_deliveries'])
+    linhas_nao_nulas = df1['Delivery_person_Age'] != 'NaN '
+    df1 = df1.loc[linhas_nao_nulas, :]
+
+    linhas_nao_nulas = df1['Road_traffic_density'] != 'NaN '
+    df1 = df1.loc[linhas_nao_nulas, :]
+
+    linhas_nao_nulas = df1['City'] != 'NaN '
+    df1 = df1.loc[linhas_nao_nulas, :]
+    linhas_nao_nulas = df1['Festival'] != 'NaN '
+    df1 = df1.loc[linhas_nao_nulas, :]
+
+    linhas_nao_nulas = df1['Weatherconditions'] != 'conditions NaN'
+    df1 = df1.loc[linhas_nao_nulas, :]
+
+    linhas_n_nulas = df1['multiple_deliveries'] != 'NaN '
+    df1 = df1.loc[linhas_n_nulas, :]
+    df1 = df1.reset_index(drop=True)
+
+    df1['Delivery_person_Age'] = df1['Delivery_person_Age'].astype(int)
+    df1['Delivery_person_Ratings'] = df1['Delivery_person_Ratings'].astype(float)
+    df1['Order_Date'] = pd.to_datetime(df1['Order_Date'], format='%d-%m-%Y')
+    df1['multiple_deliveries'] = df1['multiple_deliveries'].astype(int)
+    df1['City'] = df1['City'].astype(str)
+
+    df1['Time_taken(min)'] = df1['Time_taken(min)'].apply(lambda x: x.split('(min) ')[1] if isinstance(x, str) else x)
+
+    df1['ID'] = df1['ID'].str.strip()
+
+    df1['Delivery_person_ID'] = df1['Delivery_person_ID'].str.strip()
+    df1['Festival'] = df1['Festival'].str.strip()
+    df1['City'] = df1['City'].str.strip()
+    df1['Road_traffic_density'] = df1['Road_traffic_density'].str.strip()
+
+    return df1
+
+def synthetic_copy(df_raw, scale):
+    """ Repete o dataframe bruto `scale` vezes. """
+    return pd.concat([df_raw] * scale, ignore_index=True)
+
+def best_time(func, df_raw, repeat):
+    """ Menor tempo de `repeat` execuções e o resultado da última. """
+    melhor = float('inf')
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        resultado = func(df_raw)
+        melhor = min(melhor, time.perf_counter() - inicio)
+
+    return melhor, resultado
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--path', default=DATA_PATH)
+    parser.add_argument('--scales', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df_raw = pd.read_csv(args.path)
+
+    print(f"{'escala':>8} {'linhas':>10} {'original (s)':>14} {'vetorizado (s)':>16} {'ganho':>8}")
+    for scale in args.scales:
+        df_scaled = synthetic_copy(df_raw, scale)
+
+        tempo_legacy, esperado = best_time(clean_code_legacy, df_scaled, args.repeat)
+        tempo_novo, obtido = best_time(clean_code, df_scaled, args.repeat)
+
+        # A versão original deixa o tempo como texto e os tipos largos; a
+        # nova já entrega o tempo inteiro e os tipos compactos
+        esperado['Time_taken(min)'] = esperado['Time_taken(min)'].astype(int)
+        esperado = compact_types(esperado)
+        pd.testing.assert_frame_equal(obtido, esperado)
+
+        print(f'{scale:>8} {len(df_scaled):>10} {tempo_legacy:>14.3f} {tempo_novo:>16.3f} {tempo_legacy / tempo_novo:>7.1f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+""" Gerador de pedidos sintéticos no mesmo formato do `train.csv`.
+
+Uso:
+    python -m benchmarks.generator saida.csv --rows 1000000 [--seed 0]
+
+As distribuições (cidades, trânsito, clima, veículos, avaliações, idades)
+seguem as do `train.csv`, inclusive a sujeira: os marcadores 'NaN ' e
+'conditions NaN', o prefixo '(min) ' no tempo de entrega e os espaços no
+final dos textos. O gerador não lê o `train.csv`, então funciona para
+qualquer tamanho sem depender do arquivo original.
+"""
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['ID', 'Delivery_person_ID', 'Delivery_person_Age', 'Delivery_person_Ratings',
+           'Restaurant_latitude', 'Restaurant_longitude', 'Delivery_location_latitude',
+           'Delivery_location_longitude', 'Order_Date', 'Time_Orderd', 'Time_Order_picked',
+           'Weatherconditions', 'Road_traffic_density', 'Vehicle_condition', 'Type_of_order',
+           'Type_of_vehicle', 'multiple_deliveries', 'Festival', 'City', 'Time_taken(min)']
+
+# Prefixo do código do entregador -> centro aproximado da cidade
+CITY_CENTERS = {
+    'JAPR': (26.91, 75.79), 'COIM': (11.02, 76.96), 'RANC': (23.34, 85.31), 'MYSR': (12.30, 76.64),
+    'VADR': (22.31, 73.18), 'CHEN': (13.08, 80.27), 'PUNE': (18.52, 73.86), 'BANG': (12.97, 77.59),
+    'SURR': (21.17, 72.83), 'MUMR': (19.08, 72.88), 'INDO': (22.72, 75.86), 'HYDR': (17.39, 78.49),
+    'KOLR': (22.57, 88.36), 'AURG': (19.88, 75.34), 'LUDH': (30.90, 75.86), 'GOAR': (15.49, 73.83),
+    'DEHR': (30.32, 78.03), 'KNPR': (26.45, 80.33), 'BHPR': (23.26, 77.41), 'AGRR': (27.18, 78.01),
+    'ALHR': (25.44, 81.85), 'KOCR': (9.93, 76.27),
+}
+CITY_WEIGHTS = [8, 7, 7, 7, 7, 7, 7, 7, 7, 7, 7, 6, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1]
+
+# Valor -> frequência, como no train.csv (marcadores de NaN incluídos)
+CITY = {'Metropolitian ': 0.748, 'Urban ': 0.22, 'NaN ': 0.029, 'Semi-Urban ': 0.003}
+TRAFFIC = {'Low ': 0.347, 'Jam ': 0.30, 'Medium ': 0.243, 'High ': 0.095, 'NaN ': 0.015}
+FESTIVAL = {'No ': 0.974, 'Yes ': 0.022, 'NaN ': 0.004}
+WEATHER = {'conditions Fog': 0.175, 'conditions Windy': 0.167, 'conditions Cloudy': 0.163,
+           'conditions Stormy': 0.162, 'conditions Sunny': 0.159, 'conditions Sandstorms': 0.159,
+           'conditions NaN': 0.015}
+ORDER_TYPE = {'Snack ': 0.257, 'Meal ': 0.256, 'Buffet ': 0.244, 'Drinks ': 0.243}
+VEHICLE = {'motorcycle ': 0.586, 'scooter ': 0.332, 'electric_scooter ': 0.08, 'bicycle ': 0.002}
+MULTIPLE_DELIVERIES = {'1': 0.621, '0': 0.302, '2': 0.041, 'NaN ': 0.023, '3': 0.013}
+RATINGS = {'4.7': 0.16, '4.8': 0.16, '4.9': 0.155, '4.6': 0.155, '5': 0.085, '4.5': 0.075,
+           'NaN ': 0.044, '4.4': 0.036, '4.1': 0.031, '4.3': 0.03, '4.2': 0.029}
+VEHICLE_CONDITION = {0: 0.33, 1: 0.329, 2: 0.329, 3: 0.012}
+
+FIRST_DATE = datetime(2022, 2, 11)
+LAST_DATE = datetime(2022, 4, 6)
+
+# -----------------------------------
+# Funções
+# -----------------------------------
+def choice(rng, distribuicao, n):
+    """ Sorteia `n` valores de um dicionário valor -> frequência. """
+    valores = np.array(list(distribuicao.keys()), dtype=object)
+    pesos = np.array(list(distribuicao.values()), dtype=float)
+
+    return valores[rng.choice(len(valores), size=n, p=pesos / pesos.sum())]
+
+def courier_pool(rng, n_couriers):
+    """ Códigos de entregador no formato do csv, ex. 'INDORES13DEL02 '.
+
+    Output: (códigos, índice da cidade de cada entregador)
+    """
+    prefixos = list(CITY_CENTERS)
+    pesos = np.array(CITY_WEIGHTS, dtype=float)
+    cidade = rng.choice(len(prefixos), size=n_couriers, p=pesos / pesos.sum())
+
+    # Cada restaurante tem até 3 entregadores (DEL01..DEL03), como no original
+    restaurante = np.arange(n_couriers) // 3 + 1
+    entregador = np.arange(n_couriers) % 3 + 1
+    codigos = np.array([f'{prefixos[c]}RES{r:02d}DEL{d:02d} ' for c, r, d in zip(cidade, restaurante, entregador)], dtype=object)
+
+    return codigos, cidade
+
+def generate_orders(n_rows, seed=0, n_couriers=None, id_offset=0):
+    """ Gera `n_rows` pedidos brutos, prontos para o `clean_code`.
+
+    Input:
+        - n_rows: quantidade de linhas
+        - seed: semente do gerador aleatório
+        - n_couriers: quantidade de entregadores (padrão: 1 a cada 4 pedidos)
+        - id_offset: primeiro número do ID hexadecimal
+    Output: Dataframe bruto com as colunas do train.csv
+    """
+    rng = np.random.default_rng(seed)
+    n_couriers = n_couriers or max(10, n_rows // 4)
+
+    codigos, cidade_entregador = courier_pool(rng, n_couriers)
+    entregador = rng.integers(0, n_couriers, size=n_rows)
+    centros = np.array(list(CITY_CENTERS.values()))[cidade_entregador[entregador]]
+
+    # Restaurante perto do centro da cidade; entrega a um deslocamento fixo
+    # em graus, como no original (0.01 a 0.13 nas duas coordenadas)
+    restaurante = np.round(centros + rng.uniform(-0.1, 0.1, size=(n_rows, 2)), 6)
+    deslocamento = rng.choice(np.arange(1, 14) / 100, size=n_rows)
+    entrega = np.round(restaurante + deslocamento[:, None], 6)
+
+    # Uma pequena parte das coordenadas vem com sinal trocado (sujeira do original)
+    sinal = np.where(rng.random(n_rows) < 0.05, -1.0, 1.0)
+    restaurante[:, 0] *= sinal
+    entrega[:, 0] *= sinal
+
+    dias = (LAST_DATE - FIRST_DATE).days + 1
+    datas = np.array([(FIRST_DATE + timedelta(days=d)).strftime('%d-%m-%Y') for d in range(dias)], dtype=object)
+    horarios = np.array([f'{m // 60:02d}:{m % 60:02d}:00' for m in range(0, 24 * 60, 5)], dtype=object)
+    pedido = rng.integers(8 * 12, 24 * 12 - 3, size=n_rows)
+    retirada = pedido + rng.integers(1, 4, size=n_rows)
+    time_orderd = horarios[pedido]
+    time_orderd[rng.random(n_rows) < 0.04] = 'NaN '
+
+    city = choice(rng, CITY, n_rows)
+    traffic = choice(rng, TRAFFIC, n_rows)
+    festival = choice(rng, FESTIVAL, n_rows)
+
+    # Tempo de entrega: base por trânsito, mais festival e cidade semi-urbana
+    tempo = rng.integers(10, 40, size=n_rows)
+    tempo += np.where(traffic == 'Jam ', 8, 0) + np.where(traffic == 'High ', 4, 0)
+    tempo += np.where(festival == 'Yes ', 18, 0) + np.where(city == 'Semi-Urban ', 22, 0)
+    tempos = np.array([f'(min) {t}' for t in range(tempo.max() + 1)], dtype=object)
+
+    idades = np.array([str(a) for a in range(20, 40)] + ['NaN '], dtype=object)
+    idade = np.where(rng.random(n_rows) < 0.042, len(idades) - 1, rng.integers(0, len(idades) - 1, size=n_rows))
+
+    df_raw = pd.DataFrame({
+        'ID': np.array([f'0x{i:04x} ' for i in range(id_offset, id_offset + n_rows)], dtype=object),
+        'Delivery_person_ID': codigos[entregador],
+        'Delivery_person_Age': idades[idade],
+        'Delivery_person_Ratings': choice(rng, RATINGS, n_rows),
+        'Restaurant_latitude': restaurante[:, 0],
+        'Restaurant_longitude': restaurante[:, 1],
+        'Delivery_location_latitude': entrega[:, 0],
+        'Delivery_location_longitude': entrega[:, 1],
+        'Order_Date': datas[rng.integers(0, dias, size=n_rows)],
+        'Time_Orderd': time_orderd,
+        'Time_Order_picked': horarios[retirada],
+        'Weatherconditions': choice(rng, WEATHER, n_rows),
+        'Road_traffic_density': traffic,
+        'Vehicle_condition': choice(rng, VEHICLE_CONDITION, n_rows).astype(np.int64),
+        'Type_of_order': choice(rng, ORDER_TYPE, n_rows),
+        'Type_of_vehicle': choice(rng, VEHICLE, n_rows),
+        'multiple_deliveries': choice(rng, MULTIPLE_DELIVERIES, n_rows),
+        'Festival': festival,
+        'City': city,
+        'Time_taken(min)': tempos[tempo],
+    })
+
+    return df_raw.loc[:, COLUMNS]
+
+def write_orders(path, n_rows, seed=0, chunksize=1_000_000):
+    """ Grava `n_rows` pedidos sintéticos em csv, gerando em pedaços para
+    não precisar do arquivo inteiro em memória.
+    """
+    n_couriers = max(10, n_rows // 4)
+    for numero, inicio in enumerate(range(0, n_rows, chunksize)):
+        chunk = generate_orders(min(chunksize, n_rows - inicio), seed=seed + numero,
+                                n_couriers=n_couriers, id_offset=inicio)
+        chunk.to_csv(path, mode='w' if numero == 0 else 'a', header=numero == 0, index=False)
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera pedidos sintéticos no formato do train.csv')
+    parser.add_argument('path')
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    write_orders(args.path, args.rows, args.seed)
+    print(f'{args.rows} pedidos gravados em {args.path}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+""" Teste de carga da API de métricas (`curry_company.api`).
+
+Uso:
+    python -m curry_company.api &                       # sobe a API
+    python -m benchmarks.load_test --clients 50 --requests 5000
+    python -m benchmarks.load_test --spawn --distinct-filters 20
+
+Abre `--clients` conexões keep-alive e manda ao todo `--requests` GETs,
+sorteando o endpoint e os filtros entre `--distinct-filters` combinações
+(poucas combinações = quase tudo vem do cache; muitas = mais cálculo).
+Mede vazão e latência (p50/p90/p99). Com `--spawn`, sobe a API em um
+subprocesso e a derruba no final. Só biblioteca padrão.
+"""
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+
+from curry_company.api import ENDPOINTS, HOST, PORT
+
+TRAFFIC_SETS = ['Low,Medium,High,Jam', 'Low', 'Jam', 'Low,Medium', 'High,Jam']
+FIRST_DATE = date(2022, 2, 11)
+LAST_DATE = date(2022, 4, 6)
+
+# -----------------------------------
+# Funções
+# -----------------------------------
+def request_targets(n_filters, seed=0):
+    """ Caminhos sorteados: endpoint x uma de `n_filters` combinações de filtros. """
+    sorteio = random.Random(seed)
+    dias = (LAST_DATE - FIRST_DATE).days
+
+    filtros = [f'date={FIRST_DATE + timedelta(days=sorteio.randint(0, dias))}&traffic={sorteio.choice(TRAFFIC_SETS)}'
+               for _ in range(n_filters)]
+
+    return [f'/{endpoint}?{filtro}' for endpoint in ENDPOINTS for filtro in filtros]
+
+async def client(host, port, alvos, latencias, erros):
+    """ Uma conexão keep-alive mandando os pedidos de `alvos` em sequência. """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for alvo in alvos:
+            inicio = time.perf_counter()
+            writer.write(f'GET {alvo} HTTP/1.1\r\nHost: {host}\r\n\r\n'.encode('latin-1'))
+            await writer.drain()
+
+            status = int((await reader.readline()).split()[1])
+            tamanho = 0
+            while True:
+                linha = await reader.readline()
+                if linha in (b'\r\n', b''):
+                    break
+                nome, _, valor = linha.decode('latin-1').partition(':')
+                if nome.lower() == 'content-length':
+                    tamanho = int(valor)
+            await reader.readexactly(tamanho)
+
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            if status != 200:
+                erros.append((alvo, status))
+    finally:
+        writer.close()
+
+async def run_load(host, port, n_clients, n_requests, n_filters, seed=0):
+    alvos = request_targets(n_filters, seed)
+    sorteio = random.Random(seed)
+    pedidos = [sorteio.choice(alvos) for _ in range(n_requests)]
+
+    latencias, erros = [], []
+    inicio = time.perf_counter()
+    await asyncio.gather(*(client(host, port, pedidos[i::n_clients], latencias, erros)
+                           for i in range(n_clients)))
+    segundos = time.perf_counter() - inicio
+
+    quantis = statistics.quantiles(latencias, n=100)
+
+    return {
+        'requests': len(latencias),
+        'errors': len(erros),
+        'seconds': round(segundos, 3),
+        'requests_per_s': round(len(latencias) / segundos, 1),
+        'p50_ms': round(quantis[49], 2),
+        'p90_ms': round(quantis[89], 2),
+        'p99_ms': round(quantis[98], 2),
+        'max_ms': round(max(latencias), 2),
+    }
+
+async def wait_server(host, port, timeout=300):
+    """ Espera a API aceitar conexões (o carregamento do dataset leva alguns segundos). """
+    limite = time.perf_counter() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.perf_counter() > limite:
+                raise
+            await asyncio.sleep(0.2)
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga da API de métricas')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--clients', type=int, default=50, help='conexões simultâneas')
+    parser.add_argument('--requests', type=int, default=5000, help='total de pedidos')
+    parser.add_argument('--distinct-filters', type=int, default=10,
+                        help='combinações de data e trânsito sorteadas')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--spawn', action='store_true', help='sobe a API em um subprocesso')
+    args = parser.parse_args()
+
+    servidor = None
+    if args.spawn:
+        servidor = subprocess.Popen([sys.executable, '-m', 'curry_company.api',
+                                     '--host', args.host, '--port', str(args.port)])
+    try:
+        asyncio.run(wait_server(args.host, args.port))
+        resultado = asyncio.run(run_load(args.host, args.port, args.clients, args.requests,
+                                         args.distinct_filters, args.seed))
+    finally:
+        if servidor is not None:
+            servidor.terminate()
+            servidor.wait()
+
+    print(json.dumps(resultado, indent=2))
+    if resultado['errors']:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
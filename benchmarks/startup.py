@@ -0,0 +1,117 @@
+""" Tempo de partida a frio e de rerun de cada página.
+
+Uso:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --repeat 5 --pages Home.py pages/2_visao_entregadores.py
+
+Cada medição roda em um processo Python novo, com o script da página em
+modo "bare" do Streamlit (sem servidor), em três etapas:
+
+- import: os imports do topo do script
+- first_render: o resto do script pela primeira vez (carrega o dataset,
+  monta os agregados e a aba padrão)
+- rerun: o script inteiro de novo no mesmo processo, como um rerun do
+  Streamlit com os caches já quentes
+
+Também lista quais bibliotecas pesadas ficaram carregadas no processo
+depois do primeiro render. Com `--repeat`, vale a mediana das execuções.
+"""
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import argparse
+import ast
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PAGES = ['Home.py'] + sorted(glob.glob('pages/*.py'))
+HEAVY_MODULES = ['plotly', 'folium', 'streamlit_folium', 'PIL', 'haversine', 'pyarrow', 'streamlit']
+MARKER = '__startup__'
+
+# -----------------------------------
+# Funções
+# -----------------------------------
+def split_imports(source):
+    """ Separa o script em (imports do topo, resto). """
+    arvore = ast.parse(source)
+    fim = 0
+    for no in arvore.body:
+        if not isinstance(no, (ast.Import, ast.ImportFrom)):
+            break
+        fim = no.end_lineno
+
+    linhas = source.splitlines(keepends=True)
+
+    return ''.join(linhas[:fim]), ''.join(linhas[fim:])
+
+def measure_page(path):
+    """ Roda dentro do processo filho: mede as três etapas de uma página. """
+    with open(path, encoding='utf-8') as arquivo:
+        source = arquivo.read()
+    imports, resto = split_imports(source)
+
+    namespace = {'__name__': '__main__', '__file__': path}
+    tempos = {}
+
+    inicio = time.perf_counter()
+    exec(compile(imports, path, 'exec'), namespace)
+    tempos['import_ms'] = (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    exec(compile(resto, path, 'exec'), namespace)
+    tempos['first_render_ms'] = (time.perf_counter() - inicio) * 1000
+
+    carregados = [nome for nome in HEAVY_MODULES if nome in sys.modules]
+
+    inicio = time.perf_counter()
+    exec(compile(source, path, 'exec'), {'__name__': '__main__', '__file__': path})
+    tempos['rerun_ms'] = (time.perf_counter() - inicio) * 1000
+
+    return dict(tempos, heavy_modules=carregados)
+
+def cold_run(path):
+    """ Uma medição em um processo novo. """
+    processo = subprocess.run([sys.executable, '-m', 'benchmarks.startup', '--child', path],
+                              capture_output=True, text=True, env=dict(os.environ, PYTHONPATH=os.getcwd()))
+    for linha in processo.stdout.splitlines():
+        if linha.startswith(MARKER):
+            return json.loads(linha[len(MARKER):])
+
+    raise RuntimeError(f'{path} falhou:\n{processo.stderr[-2000:]}')
+
+def main():
+    parser = argparse.ArgumentParser(description='Tempo de partida e de rerun das páginas')
+    parser.add_argument('--pages', nargs='+', default=PAGES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=None, help='grava os resultados em json')
+    parser.add_argument('--child', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(MARKER + json.dumps(measure_page(args.child)), flush=True)
+        return
+
+    resultados = {}
+    for pagina in args.pages:
+        execucoes = [cold_run(pagina) for _ in range(args.repeat)]
+        resultados[pagina] = {
+            etapa: round(statistics.median(execucao[etapa] for execucao in execucoes), 1)
+            for etapa in ('import_ms', 'first_render_ms', 'rerun_ms')
+        }
+        resultados[pagina]['heavy_modules'] = execucoes[-1]['heavy_modules']
+
+        r = resultados[pagina]
+        print(f"{pagina:<34} import {r['import_ms']:>8.1f} ms  primeiro render {r['first_render_ms']:>8.1f} ms  "
+              f"rerun {r['rerun_ms']:>7.1f} ms  [{', '.join(r['heavy_modules'])}]")
+
+    if args.output:
+        with open(args.output, 'w') as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+""" Suíte de benchmarks do dashboard em dados sintéticos.
+
+Uso:
+    python -m benchmarks.suite --sizes 10000 1000000 10000000
+    python -m benchmarks.suite --save-baseline            # grava a referência
+    python -m benchmarks.suite --baseline benchmarks/baseline.json
+
+Para cada tamanho, gera pedidos com `benchmarks.generator` e mede em
+separado a limpeza, a preparação feita no carregamento (colunas
+derivadas, cubo e somas acumuladas) e cada função de gráfico. Os tempos
+vão para um json; com `--baseline`, cada tempo é comparado com o da
+referência e os que pioraram além de `--threshold` são marcados como
+regressão (o script sai com código 1).
+"""
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import argparse
+import json
+import platform
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from benchmarks.generator import LAST_DATE, generate_orders
+from curry_company import charts
+from curry_company.aggregates import build_cube, filter_cells
+from curry_company.cleaning import clean_code
+from curry_company.data import add_derived_columns
+from curry_company.date_index import build_prefix_sums, totals_until
+from curry_company.distinct import build_distinct, filter_distinct
+from curry_company.geo import bin_locations, distance_by_city
+from curry_company.quantiles import build_sketch, filter_quantiles
+
+SIZES = [10_000, 1_000_000, 10_000_000]
+TRAFFIC_OPTIONS = ['Low', 'Medium', 'High', 'Jam']
+RESULTS_PATH = 'benchmarks/results.json'
+BASELINE_PATH = 'benchmarks/baseline.json'
+
+# -----------------------------------
+# Funções
+# -----------------------------------
+def best_time(func, repeat):
+    """ Menor tempo de `repeat` execuções e o resultado da última. """
+    melhor = float('inf')
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        resultado = func()
+        melhor = min(melhor, time.perf_counter() - inicio)
+
+    return melhor, resultado
+
+def run_size(n_rows, repeat, seed=0):
+    """ Mede todas as etapas para um tamanho de dataset.
+
+    Output: dicionário etapa -> segundos (melhor de `repeat`)
+    """
+    tempos = {}
+    df_raw = generate_orders(n_rows, seed=seed)
+
+    def medir(nome, func, warmup=False):
+        # O primeiro gráfico de cada tipo paga imports e validadores do
+        # plotly; o aquecimento tira esse custo único da medição.
+        if warmup:
+            func()
+        tempos[nome], resultado = best_time(func, repeat)
+        print(f'{n_rows:>10} {nome:<28} {tempos[nome]:>10.4f} s', flush=True)
+        return resultado
+
+    df1 = medir('clean_code', lambda: clean_code(df_raw))
+    df1 = medir('add_derived_columns', lambda: add_derived_columns(df1.copy()))
+    cube = medir('build_cube', lambda: build_cube(df1))
+    prefix_sums = medir('build_prefix_sums', lambda: build_prefix_sums(cube))
+    couriers = medir('build_distinct', lambda: build_distinct(df1))
+    medir('build_quantiles', lambda: build_sketch(df1, 'time'))
+
+    # Filtros padrão da barra lateral: todas as datas e todo o trânsito
+    date_cutoff = LAST_DATE + timedelta(days=7)
+    linhas_selecionadas = (df1['Order_Date'] < date_cutoff) & df1['Road_traffic_density'].isin(TRAFFIC_OPTIONS)
+    df_filtrado = df1.loc[linhas_selecionadas, :]
+    cube_filtrado = filter_cells(cube, date_cutoff, TRAFFIC_OPTIONS)
+    totals = totals_until(prefix_sums, date_cutoff, TRAFFIC_OPTIONS)
+    medianas = charts.location_medians(*(filter_quantiles(build_sketch(df1, nome), date_cutoff, TRAFFIC_OPTIONS)
+                                         for nome in ('latitude', 'longitude')))
+
+    medir('order_metric', lambda: charts.order_metric(cube_filtrado), warmup=True)
+    medir('order_share_by_week', lambda: charts.order_share_by_week(cube_filtrado, filter_distinct(couriers, date_cutoff, TRAFFIC_OPTIONS)), warmup=True)
+    medir('top_delivers', lambda: charts.top_delivers(df_filtrado), warmup=True)
+    medir('distance', lambda: charts.distance(distance_by_city(df_filtrado), fig=True), warmup=True)
+    medir('avg_std_time_on_traffic', lambda: charts.avg_std_time_on_traffic(totals), warmup=True)
+    medir('country_map', lambda: charts.country_map(bin_locations(df_filtrado['Delivery_location_latitude'],
+                                                                   df_filtrado['Delivery_location_longitude'],
+                                                                   charts.MAP_GRID_DEG), medianas), warmup=True)
+
+    return tempos
+
+def compare(results, baseline, threshold):
+    """ Compara os tempos com a referência.
+
+    Output: lista de (tamanho, etapa, tempo base, tempo atual, razão) das
+            etapas que ficaram mais de `threshold` mais lentas
+    """
+    regressoes = []
+    for tamanho, tempos in results['results'].items():
+        for nome, atual in tempos.items():
+            base = baseline['results'].get(tamanho, {}).get(nome)
+            if base and atual / base > 1 + threshold:
+                regressoes.append((tamanho, nome, base, atual, atual / base))
+
+    return regressoes
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks do dashboard em dados sintéticos')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=RESULTS_PATH)
+    parser.add_argument('--baseline', default=None, help='json de referência para comparar')
+    parser.add_argument('--threshold', type=float, default=0.2, help='piora relativa tolerada (0.2 = 20%%)')
+    parser.add_argument('--save-baseline', action='store_true', help=f'grava o resultado também em {BASELINE_PATH}')
+    args = parser.parse_args()
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'machine': platform.platform(),
+            'repeat': args.repeat,
+        },
+        'results': {str(n): run_size(n, args.repeat) for n in args.sizes},
+    }
+
+    caminhos = [args.output] + ([BASELINE_PATH] if args.save_baseline else [])
+    for caminho in caminhos:
+        with open(caminho, 'w') as arquivo:
+            json.dump(results, arquivo, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as arquivo:
+            baseline = json.load(arquivo)
+
+        regressoes = compare(results, baseline, args.threshold)
+        for tamanho, nome, base, atual, razao in regressoes:
+            print(f'REGRESSÃO {tamanho:>10} {nome:<28} {base:.4f} s -> {atual:.4f} s ({razao:.2f}x)')
+        if regressoes:
+            sys.exit(1)
+        print('Nenhuma regressão acima do limite.')
+
+if __name__ == '__main__':
+    main()
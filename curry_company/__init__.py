@@ -0,0 +1,5 @@
+""" Camada compartilhada do Curry Company Growth Dashboard.
+
+Reúne o carregamento, a limpeza e as agregações usadas pelas páginas em
+`pages/`, para que cada visão não precise repetir esse código.
+"""
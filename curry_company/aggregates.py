@@ -0,0 +1,186 @@
+""" Agregados mergeáveis do dataset.
+
+Cada célula guarda, para uma combinação das dimensões, a quantidade de
+pedidos e, para cada medida, a contagem de valores, a soma e a soma dos
+quadrados. Esses três números são aditivos: células de pedaços diferentes
+do arquivo (ou de filtros diferentes) se juntam com uma simples soma, e a
+média e o desvio padrão saem deles no final.
+"""
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import numpy as np
+import pandas as pd
+
+DIMENSIONS = ['Order_Date', 'City', 'Road_traffic_density', 'Festival']
+
+# Dimensões do cubo montado no carregamento: todas as que os gráficos usam
+CUBE_DIMENSIONS = DIMENSIONS + ['Weatherconditions', 'Type_of_order', 'Type_of_vehicle']
+
+# Dimensões das células por entregador (perfil da tabela de entregadores):
+# as de filtro, para aplicar a barra lateral e o filtro de cidades, e o veículo
+COURIER_DIMENSIONS = ['Delivery_person_ID', 'Type_of_vehicle', 'Order_Date', 'Road_traffic_density', 'City']
+
+# Nome curto da medida -> coluna do dataset
+MEASURES = {
+    'time': 'Time_taken(min)',
+    'rating': 'Delivery_person_Ratings',
+}
+
+# -----------------------------------
+# Funções
+# -----------------------------------
+def summarize(df1, keys=DIMENSIONS):
+    """ Agrupa as linhas em células por `keys`.
+
+    Input: Dataframe tratado
+    Output: Dataframe indexado por `keys` com as colunas `orders` e, para
+            cada medida, `<medida>_n`, `<medida>_sum` e `<medida>_sum_sq`
+    """
+    valores = {'orders': np.ones(len(df1), dtype=np.int64)}
+    for nome, coluna in MEASURES.items():
+        x = df1[coluna].to_numpy(dtype=float)
+        presente = ~np.isnan(x)
+        x = np.where(presente, x, 0.0)
+        valores[f'{nome}_n'] = presente.astype(np.int64)
+        valores[f'{nome}_sum'] = x
+        valores[f'{nome}_sum_sq'] = x * x
+
+    celulas = pd.DataFrame(valores)
+    for chave in keys:
+        celulas[chave] = df1[chave].to_numpy()
+
+    return celulas.groupby(keys).sum()
+
+def build_cube(df1):
+    """ Cubo com uma célula por combinação existente de `CUBE_DIMENSIONS`.
+
+    Todos os gráficos de contagem e de média/desvio das páginas saem de
+    somas sobre essas células, então mudar os filtros não varre as linhas.
+    """
+    return summarize(df1, CUBE_DIMENSIONS)
+
+def build_courier_cells(df1):
+    """ Células por entregador, veículo, data e trânsito (ver `COURIER_DIMENSIONS`). """
+    return summarize(df1, COURIER_DIMENSIONS)
+
+def merge_cells(*partes):
+    """ Junta células de vários pedaços somando as que têm a mesma chave. """
+    partes = [parte for parte in partes if parte is not None]
+    niveis = list(partes[0].index.names)
+
+    return pd.concat(partes).groupby(level=niveis).sum()
+
+def add_cells(celulas, novas):
+    """ Soma as células de um lote às existentes.
+
+    Diferente de `merge_cells`, não reagrupa tudo: só as chaves do lote
+    são procuradas no índice e somadas, e as chaves novas vão para o fim.
+    O custo é o de copiar as colunas, não o de agrupar as células de novo.
+    """
+    posicoes = celulas.index.get_indexer(novas.index)
+    existentes = posicoes >= 0
+
+    valores = {}
+    for coluna in celulas.columns:
+        valores[coluna] = celulas[coluna].to_numpy(copy=True)
+        valores[coluna][posicoes[existentes]] += novas[coluna].to_numpy()[existentes]
+    if existentes.all():
+        return pd.DataFrame(valores, index=celulas.index)
+
+    novas = novas.loc[~existentes, :]
+    for coluna in celulas.columns:
+        valores[coluna] = np.concatenate([valores[coluna], novas[coluna].to_numpy()])
+
+    return pd.DataFrame(valores, index=_append_keys(celulas.index, novas.index))
+
+def _append_keys(indice, novas):
+    """ Índice com as chaves novas no fim.
+
+    O `MultiIndex.append` refatora os níveis do índice inteiro; aqui só os
+    valores novos de cada nível são acrescentados e os códigos existentes
+    são reaproveitados (ou só renumerados, quando um valor novo entra no
+    meio). Os níveis continuam em ordem, como os do `groupby`: o
+    `courier_table.courier_profile` conta com isso.
+    """
+    niveis, codigos = [], []
+    for posicao, nivel in enumerate(indice.levels):
+        valores = novas.get_level_values(posicao)
+        codigos_nivel = indice.codes[posicao]
+        faltando = valores.unique().dropna().difference(nivel)
+        if len(faltando):
+            nivel = nivel.append(faltando)
+            if not nivel.is_monotonic_increasing:
+                ordenado = nivel.sort_values()
+                codigos_nivel = np.where(codigos_nivel >= 0, ordenado.get_indexer(nivel)[codigos_nivel], -1)
+                nivel = ordenado
+        niveis.append(nivel)
+        codigos.append(np.concatenate([codigos_nivel, nivel.get_indexer(valores)]))
+
+    return pd.MultiIndex(levels=niveis, codes=codigos, names=indice.names, verify_integrity=False)
+
+def level_mask(indice, nome, teste):
+    """ `teste` aplicado aos valores distintos do nível `nome` e levado às
+    células pelos códigos, sem montar os valores de cada célula.
+    """
+    posicao = indice.names.index(nome)
+
+    # Código -1 (valor ausente) cai no False do fim
+    dentro = np.append(np.asarray(teste(indice.levels[posicao]), dtype=bool), False)
+
+    return dentro[indice.codes[posicao]]
+
+def filter_cells(celulas, date_cutoff=None, traffic_options=None, cities=None):
+    """ Aplica os filtros da barra lateral (e o de cidades) direto nas células. """
+    linhas_selecionadas = np.ones(len(celulas), dtype=bool)
+    if date_cutoff is not None:
+        linhas_selecionadas &= level_mask(celulas.index, 'Order_Date', lambda datas: datas < date_cutoff)
+    if traffic_options is not None:
+        linhas_selecionadas &= level_mask(celulas.index, 'Road_traffic_density',
+                                          lambda valores: valores.isin(traffic_options))
+    if cities is not None:
+        linhas_selecionadas &= level_mask(celulas.index, 'City', lambda valores: valores.isin(cities))
+
+    # Sem nada filtrado não há cópia; o `take` não compara o índice do
+    # resultado com o original, como o `.loc` faz
+    if linhas_selecionadas.all():
+        return celulas
+
+    return celulas.take(np.flatnonzero(linhas_selecionadas))
+
+def rollup(celulas, by):
+    """ Soma as células até sobrarem só as dimensões de `by`. """
+    return celulas.groupby(level=by).sum()
+
+def order_counts(celulas, by):
+    """ Quantidade de pedidos por `by`, no mesmo formato dos gráficos
+    (uma coluna `ID` com a contagem).
+    """
+    df_aux = rollup(celulas, by)['orders'].rename('ID')
+
+    return df_aux.reset_index()
+
+def measure_stats(celulas, by, measure):
+    """ Média e desvio padrão amostral (ddof=1, como no pandas) de uma
+    medida por `by`.
+
+    Input: células, dimensões e nome curto da medida ('time' ou 'rating')
+    Output: Dataframe indexado por `by` com as colunas `mean` e `std`
+    """
+    df_aux = rollup(celulas, by)
+    media, desvio = mean_std(df_aux[f'{measure}_n'].to_numpy(dtype=float),
+                             df_aux[f'{measure}_sum'].to_numpy(dtype=float),
+                             df_aux[f'{measure}_sum_sq'].to_numpy(dtype=float))
+
+    return pd.DataFrame({'mean': media, 'std': desvio}, index=df_aux.index)
+
+def mean_std(n, soma, soma_sq):
+    """ Média e desvio padrão amostral (ddof=1) a partir da contagem, da
+    soma e da soma dos quadrados (arrays). Sem valores a média é NaN; com
+    um só, o desvio.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        media = soma / n
+        variancia = (soma_sq - soma * media) / (n - 1)
+
+    return media, np.where(n > 1, np.sqrt(np.clip(variancia, 0, None)), np.nan)
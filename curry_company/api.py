@@ -0,0 +1,247 @@
+""" API HTTP local com as métricas do dashboard, em json.
+
+Uso:
+    python -m curry_company.api --port 8765
+    curl 'http://127.0.0.1:8765/orders_by_day?date=2022-03-15&traffic=Low,Jam'
+
+Servidor asyncio só com a biblioteca padrão. O dataset tratado e os
+agregados são carregados uma vez na subida; cada pedido monta uma
+`metrics.FilteredView` com os filtros da query e a resposta, já
+serializada, fica no cache LRU de `figure_cache` (chave: endpoint, estado
+dos filtros e parâmetros). O cálculo roda no pool de threads de
+`executor`, fora do loop, e pedidos iguais que chegam enquanto a mesma
+resposta está sendo calculada esperam por ela em vez de recalcular.
+
+Filtros (query string, todos opcionais), os mesmos da barra lateral:
+    - date: data limite, AAAA-MM-DD (padrão 2022-04-13)
+    - traffic: condições de trânsito separadas por vírgula (padrão: todas)
+    - cities: cidades separadas por vírgula (padrão: todas)
+"""
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import argparse
+import asyncio
+import json
+import sys
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from curry_company.aggregates import measure_stats
+from curry_company.buckets import orders_by_bucket
+from curry_company.charts import distance, ratings_by, traffic_share
+from curry_company.data import (DATA_PATH, load_courier_cells, load_cube, load_date_index, load_distinct,
+                                load_prefix_sums)
+from curry_company.executor import worker_pool
+from curry_company.figure_cache import cached_figure, figure_cache_stats
+from curry_company.metrics import BACKEND, filtered_view, load_backend
+from curry_company.ranking import METRICS
+from curry_company.report import to_jsonable
+from curry_company.scaffold import DATE_CUTOFF, TRAFFIC_OPTIONS
+
+HOST = '127.0.0.1'
+PORT = 8765
+
+# Limite de tamanho da linha de pedido e dos cabeçalhos
+MAX_LINE = 8 * 1024
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error'}
+
+# -----------------------------------
+# Métricas
+# -----------------------------------
+def festival_times(view):
+    """ Tempo médio e desvio padrão de entrega com e sem festival. """
+    df_aux = measure_stats(view.totals, ['Festival'], 'time').round(2)
+    df_aux.columns = ['avg_time', 'std_time']
+
+    return df_aux
+
+def courier_rankings(view, k='10', metric='max'):
+    if metric not in METRICS:
+        raise ValueError(f'metric deve ser uma de {sorted(METRICS)}')
+    k = int(k)
+    if k < 1:
+        raise ValueError('k deve ser um inteiro maior ou igual a 1')
+    mais_rapidos, mais_lentos = view.top_delivers(k, metric)
+
+    return {'fastest': mais_rapidos, 'slowest': mais_lentos}
+
+def courier_ratings(view, by='Road_traffic_density'):
+    if by not in ('Road_traffic_density', 'Weatherconditions'):
+        raise ValueError("by deve ser 'Road_traffic_density' ou 'Weatherconditions'")
+
+    return ratings_by(view.totals, by)
+
+def orders_by_day(view, granularity='day'):
+    if granularity not in ('day', 'week', 'month'):
+        raise ValueError("granularity deve ser 'day', 'week' ou 'month'")
+
+    return orders_by_bucket(view.cube, granularity)
+
+# Endpoint -> função (view, **parâmetros da query) -> resultado
+ENDPOINTS = {
+    'orders_by_day': orders_by_day,
+    'traffic_share': lambda view: traffic_share(view.totals),
+    'avg_distance': lambda view: distance(view.distances, fig=False),
+    'festival_times': festival_times,
+    'courier_rankings': courier_rankings,
+    'courier_ratings': courier_ratings,
+}
+
+def warm_up(path=DATA_PATH):
+    """ Carrega o dataset e os agregados usados pelos endpoints (com o
+    backend sqlite, só garante o banco em dia).
+    """
+    load_backend(path)
+    if BACKEND == 'sqlite':
+        return
+
+    for loader in (load_cube, load_date_index, load_prefix_sums, load_courier_cells, load_distinct):
+        loader(path)
+
+def parse_filters(query):
+    """ Filtros da query string -> argumentos de `FilteredView` e o resto. """
+    parametros = {nome: valores[-1] for nome, valores in parse_qs(query).items()}
+
+    data = pd.Timestamp(parametros.pop('date', DATE_CUTOFF))
+    trafego = parametros.pop('traffic', ','.join(TRAFFIC_OPTIONS)).split(',')
+    if not set(trafego) <= set(TRAFFIC_OPTIONS):
+        raise ValueError(f'traffic deve ter valores de {TRAFFIC_OPTIONS}')
+    cidades = parametros.pop('cities', None)
+
+    return (data, trafego, None if cidades is None else cidades.split(',')), parametros
+
+def build_body(endpoint, view, **parametros):
+    resultado = ENDPOINTS[endpoint](view, **parametros)
+    corpo = {'filters': {'date': view.date_cutoff.strftime('%Y-%m-%d'), 'traffic': view.traffic_options,
+                         'cities': view.cities},
+             'data': to_jsonable(resultado)}
+
+    return json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+
+def metric_response(endpoint, query, path=DATA_PATH):
+    """ Corpo json de um endpoint de métrica, do cache ou calculado. """
+    filtros, parametros = parse_filters(query)
+    view = filtered_view(*filtros, path=path)
+
+    return cached_figure(f'api:{endpoint}', view.key, build_body, endpoint, view, **parametros)
+
+# -----------------------------------
+# Servidor
+# -----------------------------------
+class MetricsServer:
+    """ Servidor HTTP/1.1 mínimo (GET, keep-alive) sobre `asyncio`. """
+
+    def __init__(self, path=DATA_PATH):
+        self.path = path
+        self._pendentes = {}
+
+    async def respond(self, endpoint, query):
+        """ Calcula no pool de threads; pedidos iguais simultâneos
+        compartilham o mesmo cálculo.
+        """
+        chave = (endpoint, query)
+        if chave not in self._pendentes:
+            loop = asyncio.get_running_loop()
+            futuro = loop.run_in_executor(worker_pool(), metric_response, endpoint, query, self.path)
+            self._pendentes[chave] = futuro
+            futuro.add_done_callback(lambda _: self._pendentes.pop(chave, None))
+
+        return await asyncio.shield(self._pendentes[chave])
+
+    async def route(self, method, target):
+        """ Status e corpo json da resposta. """
+        if method != 'GET':
+            return 405, {'error': 'só GET'}
+
+        url = urlsplit(target)
+        endpoint = url.path.strip('/')
+        if endpoint in ('', 'endpoints'):
+            return 200, {'endpoints': sorted(ENDPOINTS) + ['health']}
+        if endpoint == 'health':
+            return 200, {'status': 'ok', 'figure_cache': figure_cache_stats()}
+        if endpoint not in ENDPOINTS:
+            return 404, {'error': f'endpoint desconhecido: {endpoint}'}
+
+        try:
+            return 200, await self.respond(endpoint, url.query)
+        except (ValueError, TypeError) as erro:
+            return 400, {'error': str(erro)}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                linha = await reader.readline()
+                if not linha:
+                    break
+
+                partes = linha.decode('latin-1').split()
+                if len(partes) != 3:
+                    await self.send(writer, 400, {'error': 'pedido inválido'}, False)
+                    break
+                method, target, versao = partes
+
+                cabecalhos = {}
+                while True:
+                    linha = await reader.readline()
+                    if linha in (b'\r\n', b'\n', b''):
+                        break
+                    nome, _, valor = linha.decode('latin-1').partition(':')
+                    cabecalhos[nome.strip().lower()] = valor.strip().lower()
+
+                conexao = cabecalhos.get('connection', 'keep-alive' if versao == 'HTTP/1.1' else 'close')
+                manter = conexao != 'close'
+
+                try:
+                    status, corpo = await self.route(method, target)
+                except Exception as erro:
+                    status, corpo = 500, {'error': repr(erro)}
+                await self.send(writer, status, corpo, manter)
+
+                if not manter:
+                    break
+        except (ConnectionError, ValueError):
+            # ValueError: linha maior que MAX_LINE
+            pass
+        finally:
+            writer.close()
+
+    async def send(self, writer, status, corpo, manter):
+        if not isinstance(corpo, bytes):
+            corpo = json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+
+        cabecalho = (f'HTTP/1.1 {status} {REASONS[status]}\r\n'
+                     'Content-Type: application/json; charset=utf-8\r\n'
+                     f'Content-Length: {len(corpo)}\r\n'
+                     f'Connection: {"keep-alive" if manter else "close"}\r\n'
+                     '\r\n')
+        writer.write(cabecalho.encode('latin-1') + corpo)
+        await writer.drain()
+
+async def serve(host=HOST, port=PORT, path=DATA_PATH):
+    servidor = await asyncio.start_server(MetricsServer(path).handle, host, port, limit=MAX_LINE)
+    print(f'Métricas em http://{host}:{port}/', flush=True)
+
+    async with servidor:
+        await servidor.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='API local com as métricas do dashboard')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--path', default=DATA_PATH, help='csv do dataset')
+    args = parser.parse_args(argv)
+
+    warm_up(args.path)
+    try:
+        asyncio.run(serve(args.host, args.port, args.path))
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
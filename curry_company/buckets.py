@@ -0,0 +1,76 @@
+""" Chaves inteiras de período (dia, semana, mês) para as séries temporais.
+
+As chaves são calculadas com aritmética de datas do numpy sobre as datas
+distintas das células (uma por dia), não sobre as linhas, e contam
+períodos desde 1970-01-01:
+
+- dia: dias desde a época
+- semana: semanas de domingo a sábado (as mesmas do `%U`) desde a época;
+  como a contagem não recomeça em janeiro, a semana que cruza a virada do
+  ano é uma semana só, e semanas de anos diferentes nunca se misturam
+- mês: meses desde a época (ano * 12 + mês)
+
+Os gráficos escolhem a granularidade e recebem a série já agregada por
+período, com a data de início de cada período para o eixo x.
+"""
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import numpy as np
+import pandas as pd
+
+from curry_company.aggregates import order_counts
+
+# 1970-01-01 foi uma quinta-feira: somar 4 dias alinha as semanas no domingo
+_WEEK_SHIFT = 4
+
+# -----------------------------------
+# Funções
+# -----------------------------------
+def bucket_keys(dates, granularity):
+    """ Chave inteira do período de cada data.
+
+    Input: datas (Series, Index ou array datetime64) e granularidade
+    Output: array int32
+    """
+    dias = np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+
+    if granularity == 'day':
+        chaves = dias
+    elif granularity == 'week':
+        chaves = (dias + _WEEK_SHIFT) // 7
+    elif granularity == 'month':
+        chaves = np.asarray(dates, dtype='datetime64[M]').astype(np.int64)
+    else:
+        raise ValueError(f'granularidade desconhecida: {granularity}')
+
+    return chaves.astype(np.int32)
+
+def bucket_start(chaves, granularity):
+    """ Data de início de cada período, para o eixo dos gráficos. """
+    chaves = np.asarray(chaves, dtype=np.int64)
+
+    if granularity == 'day':
+        inicio = chaves.astype('datetime64[D]')
+    elif granularity == 'week':
+        inicio = (chaves * 7 - _WEEK_SHIFT).astype('datetime64[D]')
+    elif granularity == 'month':
+        inicio = chaves.astype('datetime64[M]')
+    else:
+        raise ValueError(f'granularidade desconhecida: {granularity}')
+
+    return pd.to_datetime(inicio)
+
+def orders_by_bucket(celulas, granularity):
+    """ Pedidos por período a partir das células do cubo.
+
+    As células têm uma linha por data, então a conta é sobre as datas
+    distintas, não sobre as linhas.
+
+    Output: Dataframe com `Period` (início do período) e `ID` (pedidos)
+    """
+    por_data = order_counts(celulas, ['Order_Date'])
+    chaves = bucket_keys(por_data['Order_Date'], granularity)
+    por_periodo = por_data['ID'].groupby(chaves).sum()
+
+    return pd.DataFrame({'Period': bucket_start(por_periodo.index, granularity), 'ID': por_periodo.to_numpy()})
@@ -0,0 +1,230 @@
+""" Gráficos e tabelas das páginas do dashboard.
+
+As funções que só contam pedidos ou calculam média/desvio recebem células
+do cubo já filtradas e não olham as linhas: o cubo por data filtrado
+(`aggregates.filter_cells`) para as séries diárias, ou os totais até a
+data de corte (`date_index.totals_until`) para o resto. O mapa e a
+distância recebem agregados próprios (células da grade do mapa e
+distância por cidade, ver `geo`) e só o ranking de entregadores continua
+recebendo o dataframe filtrado.
+"""
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import numpy as np
+import pandas as pd
+
+from curry_company.aggregates import measure_stats, order_counts
+from curry_company.buckets import bucket_start, orders_by_bucket
+from curry_company.distinct import distinct_by_bucket
+from curry_company.quantiles import quantiles_by
+from curry_company.ranking import group_metric, top_k_per_group
+from curry_company.scaffold import lazy_module
+
+# Importados só quando algum gráfico é montado (ver `scaffold.lazy_module`)
+px = lazy_module('plotly.express')
+go = lazy_module('plotly.graph_objects')
+folium = lazy_module('folium')
+folium_plugins = lazy_module('folium.plugins')
+components = lazy_module('streamlit.components.v1')
+
+# Tamanho da célula da grade do mapa de calor, em graus (~5 km)
+MAP_GRID_DEG = 0.05
+
+# -----------------------------------
+# Visão Empresa
+# -----------------------------------
+def order_metric(cube, granularity='day'):
+    df_aux = orders_by_bucket(cube, granularity)
+    fig = px.bar(df_aux, x = 'Period', y = 'ID')
+
+    return fig
+
+def traffic_share(cube):
+    """ Pedidos e fração dos pedidos por tipo de tráfego. """
+    df_aux = order_counts(cube, ['Road_traffic_density'])
+    
+    df_aux = df_aux.loc[df_aux['Road_traffic_density'] != 'NaN', :]
+    df_aux['entregas_perc'] = df_aux['ID']/df_aux['ID'].sum()
+
+    return df_aux
+
+def traffic_order_share(cube):
+    df_aux = traffic_share(cube)
+
+    fig = px.pie(df_aux, values = 'entregas_perc', names='Road_traffic_density')
+                    
+    return fig
+
+def traffic_order_city(cube):
+    df_aux = order_counts(cube, ['City', 'Road_traffic_density'])
+                
+    fig = px.scatter(df_aux, x='City', y='Road_traffic_density', size='ID', color='City')
+
+    return fig
+
+def order_by_week(cube, granularity='week'):
+    df_aux = orders_by_bucket(cube, granularity)
+    fig = px.line(df_aux, x= 'Period', y = 'ID')
+
+    return fig
+
+def order_share_by_week(cube, couriers, granularity='week'):
+        """ Pedidos por entregador ativo em cada período.
+
+        Input: cubo e esboço de entregadores distintos (ver `distinct`),
+               os dois já filtrados
+        """
+        df_aux = orders_by_bucket(cube, granularity).set_index('Period')
+        entregadores = distinct_by_bucket(couriers, granularity)
+        df_aux['Delivery_person_ID'] = entregadores.set_axis(bucket_start(entregadores.index, granularity))
+        df_aux['order_by_deliver'] = df_aux['ID'] / df_aux['Delivery_person_ID']
+        df_aux = df_aux.reset_index()
+ 
+        fig = px.line(df_aux, x='Period', y='order_by_deliver')
+
+        return fig
+
+def location_medians(latitude, longitude):
+    """ Localização mediana de entrega por cidade e tráfego, a partir dos
+    esboços de quantis das coordenadas (ver `quantiles`), já filtrados.
+    """
+    por = ['City', 'Road_traffic_density']
+    df_aux = pd.DataFrame({
+        'Delivery_location_latitude': quantiles_by(latitude, por, [0.5])['p50'],
+        'Delivery_location_longitude': quantiles_by(longitude, por, [0.5])['p50'],
+    })
+
+    return df_aux.reset_index()
+
+def country_map(celulas, medians):
+    """ Mapa com todas as entregas agregadas em uma grade (mapa de calor) e
+    um marcador na localização mediana de cada cidade e tipo de tráfego.
+
+    O mapa de calor recebe uma linha por célula ocupada da grade
+    (`geo.bin_locations`, com `MAP_GRID_DEG`), não por pedido, então o
+    tamanho do HTML não cresce com a quantidade de pedidos. As medianas vêm
+    de `location_medians`.
+    """
+    map = folium.Map()
+
+    celulas = celulas.assign(orders=celulas['orders'] / celulas['orders'].max())
+    folium_plugins.HeatMap(celulas.to_numpy().tolist(), name='Entregas', radius=12).add_to(map)
+
+    medianas = folium.FeatureGroup(name='Mediana por cidade e tráfego')
+    for cidade, trafego, lat, lon in zip(medians['City'], medians['Road_traffic_density'],
+                                         medians['Delivery_location_latitude'], medians['Delivery_location_longitude']):
+        folium.Marker([lat, lon], popup=f'{cidade} - {trafego}').add_to(medianas)
+    medianas.add_to(map)
+    folium.LayerControl().add_to(map)
+
+    return map
+
+def country_map_html(celulas, medians):
+    return folium.Figure().add_child(country_map(celulas, medians)).render()
+
+def show_country_map(html):
+    components.html(html, width=1024, height=610)
+
+# -----------------------------------
+# Visão Entregadores
+# -----------------------------------
+def top_delivers(df1, k=10, metric='max', cities=None):
+    """ Os k entregadores mais rápidos e os k mais lentos de cada cidade.
+
+    Input:
+        - k: entregadores por cidade
+        - metric: tempo de entrega de cada entregador: 'max', 'mean' ou 'p90'
+        - cities: cidades mostradas, nessa ordem (padrão: todas as do filtro)
+    Output: (mais rápidos, mais lentos), calculados na mesma passada
+    """
+    tempos = group_metric(df1, 'City', 'Delivery_person_ID', 'Time_taken(min)', metric)
+
+    return top_k_per_group(tempos, k, cities)
+
+def ratings_by(cube, coluna):
+    """ Avaliação média e desvio padrão dos entregadores por `coluna`. """
+    avaliacao = measure_stats(cube, [coluna], 'rating')
+    avaliacao.columns = ['avaliacao_media', 'avaliacao_std']
+
+    return avaliacao
+
+# -----------------------------------
+# Visão Restaurantes
+# -----------------------------------
+def distance(celulas, fig):
+            if fig == False:
+                # Sem pedidos na seleção a média fica NaN, como a das linhas
+                with np.errstate(invalid='ignore'):
+                    avg_distance = np.round(celulas['distance_sum'].sum() / celulas['distance_n'].sum(), 2)
+
+                return avg_distance
+            
+            else:
+                avg_distance = ((celulas['distance_sum'] / celulas['distance_n'])
+                                .rename('distance')
+                                .reset_index())
+                fig = go.Figure(data = [go.Pie(labels=avg_distance['City'], values = avg_distance['distance'], pull=[0,0.05,0])])
+
+                return fig                
+
+def avg_std_time_delivery(cube, festival, op):
+    '''
+        A função calcula o tempo médio e o desvio padrão do tempo de entrega.
+        Parâmetros:
+            Input:
+                - cube: Cubo filtrado com os dados necessários para o cálculo
+                - op: Tipo de operação que precisa ser calculado:
+                    'avg_time': calcula o tempo médio
+                    'std_time': calcula o desvio padrão do tempo
+            Output:
+                - df: Dataframe com 2 colunas e 1 linha    
+    '''
+    df_aux = measure_stats(cube, ['Festival'], 'time')
+            
+    df_aux.columns = ['avg_time', 'std_time']
+    df_aux = df_aux.reset_index()
+    df_aux = np.round(df_aux.loc[df_aux['Festival'] == festival, op], 2)
+
+    return df_aux
+
+def avg_std_time_graph(cube):
+    tempo = measure_stats(cube, ['City'], 'time')
+    tempo.columns = ['tempo_medio', 'tempo_std']
+    tempo = tempo.reset_index()
+    
+    fig = go.Figure()
+    fig.add_trace(go.Bar(name = 'Control',
+                        x = tempo['City'],
+                        y = tempo['tempo_medio'],
+                        error_y = dict(type='data', array=tempo['tempo_std'])))                       
+    fig.update_layout(barmode='group')
+
+    return fig
+
+def avg_std_time_on_traffic(cube):
+    tempo = measure_stats(cube, ['City', 'Road_traffic_density'], 'time')
+    tempo.columns = ['tempo_medio', 'tempo_std']
+    tempo = tempo.reset_index()
+    fig = px.sunburst(tempo, path=['City', 'Road_traffic_density'], values='tempo_medio',
+                    color='tempo_std', color_continuous_scale='RdBu',
+                    color_continuous_midpoint=np.average(tempo['tempo_std']))
+    
+    return fig
+
+def time_percentiles_graph(quantis, coluna):
+    """ p50, p90 e p99 do tempo de entrega por `coluna`.
+
+    Input: esboço de quantis do tempo (ver `quantiles`), já filtrado
+    """
+    df_aux = quantiles_by(quantis, [coluna]).round(1).reset_index()
+    df_aux = df_aux.melt(id_vars=coluna, var_name='percentil', value_name='Time_taken(min)')
+    fig = px.bar(df_aux, x=coluna, y='Time_taken(min)', color='percentil', barmode='group')
+
+    return fig
+
+def avg_std_time_by_order_type(cube):
+    tempo = measure_stats(cube, ['City', 'Type_of_order'], 'time')
+    tempo.columns = ['tempo_medio', 'tempo_std']
+
+    return tempo
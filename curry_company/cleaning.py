@@ -0,0 +1,78 @@
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import numpy as np
+import pandas as pd
+
+from curry_company.schema import compact_types
+
+# Marcador de valor ausente de cada coluna no csv original
+NAN_MARKERS = {
+    'Delivery_person_Age': 'NaN ',
+    'Road_traffic_density': 'NaN ',
+    'City': 'NaN ',
+    'Festival': 'NaN ',
+    'Weatherconditions': 'conditions NaN',
+    'multiple_deliveries': 'NaN ',
+}
+
+# Colunas de texto que chegam com espaço no final
+STRIP_COLUMNS = ['ID', 'Delivery_person_ID', 'Festival', 'City', 'Road_traffic_density']
+
+# -----------------------------------
+# Funções
+# -----------------------------------
+def valid_rows(df1):
+    """ Monta em uma única passada a máscara das linhas sem NaN (nulo de
+    verdade ou o marcador de texto) em nenhuma das colunas de `NAN_MARKERS`.
+    """
+    linhas_validas = np.ones(len(df1), dtype=bool)
+    for coluna, marcador in NAN_MARKERS.items():
+        valores = df1[coluna].to_numpy()
+        linhas_validas &= ~pd.isna(valores)
+        linhas_validas &= valores != marcador
+
+    return linhas_validas
+
+def map_unique(valores, func):
+    """ Aplica `func` só nos valores distintos de uma coluna e espalha o
+    resultado de volta pelas linhas com os códigos do `pd.factorize`.
+
+    As colunas do dataset têm poucos valores distintos (idades, datas,
+    tempos, cidades), então converter ou limpar os distintos custa quase
+    nada perto de fazer o mesmo linha a linha.
+    """
+    codigos, unicos = pd.factorize(valores, use_na_sentinel=False)
+
+    return func(pd.Series(unicos)).to_numpy()[codigos]
+
+def clean_code(df1, compact=True):
+    """ Essa função tem a responsabilidade de limpar o dataframe
+    
+    Tipo de limpeza:
+    1. Remoção dos dados NaN (uma única máscara e uma única cópia)
+    2. Mudança dos tipos da coluna de dados
+    3. Remoção dos espaços das variáveis de texto
+    4. Formatação da coluna de datas
+    5. Limpeza da coluna de tempo (remoção do texto e conversão para inteiro)
+    6. Tipos compactos (ver `schema`), a menos que `compact=False`
+
+    Input: Dataframe
+    Output: Dataframe tratado   
+    
+    """
+    df1 = df1.loc[valid_rows(df1), :].reset_index(drop=True)
+
+    df1['Delivery_person_Age'] = map_unique(df1['Delivery_person_Age'], lambda x: x.astype(int))
+    df1['Delivery_person_Ratings'] = map_unique(df1['Delivery_person_Ratings'], lambda x: x.astype(float))
+    df1['Order_Date'] = map_unique(df1['Order_Date'], lambda x: pd.to_datetime(x, format='%d-%m-%Y'))
+    df1['multiple_deliveries'] = map_unique(df1['multiple_deliveries'], lambda x: x.astype(int))
+    df1['Time_taken(min)'] = map_unique(df1['Time_taken(min)'], lambda x: x.str.removeprefix('(min) ').astype(int))
+
+    for coluna in STRIP_COLUMNS:
+        df1[coluna] = map_unique(df1[coluna], lambda x: x.str.strip())
+
+    if compact:
+        df1 = compact_types(df1)
+
+    return df1
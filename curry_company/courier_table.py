@@ -0,0 +1,156 @@
+""" Tabela de entregadores paginada, com ordenação e busca no servidor.
+
+O perfil de cada entregador (avaliação média e desvio, pedidos, tempo
+médio de entrega e veículo mais usado) sai das células por entregador
+montadas no carregamento (`data.load_courier_cells`), já filtradas pela
+barra lateral, somadas pelos códigos do índice sem agrupar nem ordenar
+(no backend sqlite, as somas vêm do banco: `sqlite_store.courier_sums_sql`).
+A ordenação é feita uma vez por filtro e coluna e fica no cache de
+gráficos; a busca por prefixo e a paginação só recortam o perfil
+ordenado, então cada rerun envia ao navegador uma única página de linhas.
+"""
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import math
+
+import numpy as np
+import pandas as pd
+
+from curry_company.aggregates import mean_std
+from curry_company.figure_cache import cached_figure
+from curry_company.scaffold import st
+
+PAGE_SIZE = 25
+
+# Coluna do perfil -> rótulo na tela
+COLUMNS = {
+    'Delivery_person_ID': 'Entregador',
+    'avaliacao_media': 'Avaliação média',
+    'avaliacao_std': 'Avaliação std',
+    'pedidos': 'Pedidos',
+    'tempo_medio': 'Tempo médio (min)',
+    'veiculo': 'Veículo',
+}
+
+# -----------------------------------
+# Funções
+# -----------------------------------
+def courier_profile(celulas):
+    """ Uma linha por entregador a partir das células já filtradas.
+
+    As somas por entregador (e por entregador e veículo) são um
+    `np.bincount` sobre os códigos do índice: uma passada pelas células,
+    sem agrupar nem ordenar. Os níveis do índice estão em ordem (ver
+    `aggregates.add_cells`), então o perfil já sai na ordem do ID.
+
+    Input: células de `aggregates.build_courier_cells`
+    Output: Dataframe com as colunas de `COLUMNS`, na ordem do ID
+    """
+    indice = celulas.index
+    ids = indice.levels[indice.names.index('Delivery_person_ID')]
+    veiculos = indice.levels[indice.names.index('Type_of_vehicle')]
+    codigos = indice.codes[indice.names.index('Delivery_person_ID')]
+    codigos_veiculo = indice.codes[indice.names.index('Type_of_vehicle')]
+
+    # Células sem entregador ou sem veículo ficam de fora, como no groupby
+    validas = (codigos >= 0) & (codigos_veiculo >= 0)
+    codigos, codigos_veiculo = codigos[validas], codigos_veiculo[validas]
+
+    def somar(coluna, grupos=codigos, n_grupos=len(ids)):
+        return np.bincount(grupos, weights=celulas[coluna].to_numpy(dtype=float)[validas], minlength=n_grupos)
+
+    somas = {coluna: somar(coluna) for coluna in celulas.columns}
+
+    # Veículo com mais pedidos de cada entregador; nos empates, o primeiro
+    # na ordem dos veículos. Sem veículos (seleção vazia) não há entregadores.
+    por_veiculo = somar('orders', codigos * len(veiculos) + codigos_veiculo, len(ids) * len(veiculos))
+    if len(veiculos):
+        veiculo = por_veiculo.reshape(len(ids), len(veiculos)).argmax(axis=1)
+    else:
+        veiculo = np.zeros(len(ids), dtype=np.int64)
+
+    presentes = np.flatnonzero(somas['orders'] > 0)
+    somas = {coluna: valores[presentes] for coluna, valores in somas.items()}
+    somas['Delivery_person_ID'] = np.asarray(ids)[presentes]
+    somas['Type_of_vehicle'] = np.asarray(veiculos)[veiculo[presentes]]
+
+    return profile_from_sums(somas)
+
+def profile_from_sums(somas):
+    """ Perfil a partir das somas por entregador.
+
+    Input: colunas das células (`orders`, `<medida>_n`, ...) somadas por
+           entregador, mais `Delivery_person_ID` e `Type_of_vehicle` (o
+           veículo de mais pedidos), uma linha por entregador na ordem do
+           ID; um Dataframe ou um dict de arrays
+    Output: Dataframe com as colunas de `COLUMNS`
+    """
+    def coluna(nome):
+        return np.asarray(somas[nome], dtype=float)
+
+    avaliacao_media, avaliacao_std = mean_std(coluna('rating_n'), coluna('rating_sum'), coluna('rating_sum_sq'))
+    tempo_medio, _ = mean_std(coluna('time_n'), coluna('time_sum'), coluna('time_sum_sq'))
+
+    return pd.DataFrame({
+        'Delivery_person_ID': np.asarray(somas['Delivery_person_ID'], dtype=object),
+        'avaliacao_media': avaliacao_media.round(2),
+        'avaliacao_std': avaliacao_std.round(2),
+        'pedidos': coluna('orders').astype(np.int64),
+        'tempo_medio': tempo_medio.round(2),
+        'veiculo': pd.Series(np.asarray(somas['Type_of_vehicle'], dtype=object)).str.strip(),
+    })
+
+def sort_profile(perfil, coluna, ascending):
+    """ Perfil ordenado por `coluna`. O perfil vem na ordem do ID e a
+    ordenação é estável, então os empates ficam na ordem do ID.
+    """
+    return perfil.sort_values(coluna, ascending=ascending, kind='stable', na_position='last', ignore_index=True)
+
+def search(perfil, prefix):
+    """ Só os entregadores cujo ID começa com `prefix` (sem diferenciar maiúsculas). """
+    prefix = prefix.strip().upper()
+    if not prefix:
+        return perfil
+
+    return perfil.loc[perfil['Delivery_person_ID'].str.upper().str.startswith(prefix), :]
+
+def page_of(perfil, page, page_size=PAGE_SIZE):
+    """ Linhas da página `page` (começando em 1). """
+    inicio = (page - 1) * page_size
+
+    return perfil.iloc[inicio:inicio + page_size]
+
+def courier_table(perfil, cache_key, key='courier_table'):
+    """ Desenha a tabela: busca, ordenação, página e as linhas da página.
+
+    Input:
+        - perfil: saída de `courier_profile`
+        - cache_key: estado dos filtros (ver `figure_cache.filter_key`)
+        - key: prefixo das chaves dos widgets
+    """
+    col1, col2, col3 = st.columns([2, 2, 1])
+    prefixo = col1.text_input('Buscar ID', key=f'{key}_prefix')
+    coluna = col2.selectbox('Ordenar por', list(COLUMNS), index=1, format_func=COLUMNS.get,
+                            key=f'{key}_sort')
+    crescente = col3.radio('Ordem', ['↓', '↑'], horizontal=True, key=f'{key}_order') == '↑'
+
+    ordenado = cached_figure('courier_sorted', cache_key, sort_profile, perfil,
+                             coluna=coluna, ascending=crescente)
+
+    encontrados = search(ordenado, prefixo)
+    paginas = max(1, math.ceil(len(encontrados) / PAGE_SIZE))
+
+    # O estado do widget é a própria chave, semeada só na primeira vez (ver
+    # `scaffold.sidebar_filters`); uma busca nova pode deixar a página
+    # escolhida além da última
+    chave_pagina = f'{key}_page'
+    if chave_pagina not in st.session_state:
+        st.session_state[chave_pagina] = 1
+    elif st.session_state[chave_pagina] > paginas:
+        st.session_state[chave_pagina] = paginas
+    pagina = st.number_input(f'Página (de {paginas})', min_value=1, max_value=paginas, key=chave_pagina)
+
+    linhas = page_of(encontrados, pagina)
+    st.dataframe(linhas.rename(columns=COLUMNS), hide_index=True, use_container_width=True)
+    st.caption(f'{len(encontrados)} entregadores')
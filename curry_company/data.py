@@ -0,0 +1,236 @@
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import os
+import threading
+
+from curry_company.aggregates import add_cells, build_courier_cells, build_cube
+from curry_company.distinct import build_distinct, merge_distinct
+from curry_company.quantiles import SKETCHES, add_quantiles, build_sketch
+from curry_company.date_index import (add_prefix_sums, build_date_index, build_prefix_sums, insert_sorted,
+                                      sort_by_date)
+from curry_company.geo import add_distance
+from curry_company.schema import union_categories
+from curry_company.snapshot import load_dataset, read_new_segments
+
+DATA_PATH = 'train.csv'
+
+# -----------------------------------
+# Cache do processo
+# -----------------------------------
+# O cache é um dicionário de módulo, então é compartilhado por todas as
+# páginas e sessões do mesmo processo do Streamlit. A chave é o caminho
+# real do arquivo e o valor guarda a identidade (dispositivo, inode,
+# mtime e tamanho) que gerou o dataframe em cache, o próprio dataframe, os
+# objetos derivados dele (cubo, índices...) e quais segmentos do snapshot
+# ele já contém.
+_cache = {}
+_stats = {'hits': 0, 'misses': 0, 'extensions': 0, 'invalidations': 0}
+_lock = threading.RLock()
+
+# -----------------------------------
+# Funções
+# -----------------------------------
+def source_key(path):
+    """ Identidade do arquivo de origem: caminho real, dispositivo, inode,
+    mtime (em ns) e tamanho. Qualquer troca ou edição do arquivo muda a chave.
+    """
+    info = os.stat(path)
+    return (os.path.realpath(path), info.st_dev, info.st_ino, info.st_mtime_ns, info.st_size)
+
+def add_derived_columns(df1):
+    """ Colunas calculadas uma vez no carregamento, para que as páginas
+    não precisem recalcular (nem alterar) o dataframe a cada rerun.
+
+    O dataframe também sai ordenado por `Order_Date` (ver `date_index`).
+    O snapshot já é gravado ordenado e com as colunas derivadas, então ao
+    abri-lo nada aqui é recalculado nem copiado.
+
+    - distance: distância restaurante -> entrega em km
+    """
+    df1 = sort_by_date(df1)
+    if 'distance' not in df1.columns:
+        df1 = add_distance(df1)
+
+    return df1
+
+def _load_entry(path):
+    """ Entrada do cache para o arquivo, lendo de novo se ele mudou.
+
+    Se o arquivo mudou porque lotes foram anexados (ver `ingest`), por este
+    ou por outro processo, só os segmentos novos do snapshot são lidos e
+    anexados à entrada.
+    """
+    key = source_key(path)
+
+    # O lock fica preso durante a leitura para que várias sessões abrindo
+    # ao mesmo tempo não façam a mesma leitura em paralelo.
+    with _lock:
+        entry = _cache.get(key[0])
+        if entry is not None and entry['key'] == key:
+            _stats['hits'] += 1
+            return entry
+
+        if entry is not None and entry['segments'] is not None:
+            novos = read_new_segments(path, entry['segments'])
+            if novos is not None:
+                _stats['extensions'] += 1
+                entry = _cache[key[0]] = _extend_entry(entry, key, *novos)
+                return entry
+
+        _stats['misses'] += 1
+        df1, segmentos = load_dataset(path)
+        entry = {'key': key, 'df': add_derived_columns(df1), 'derived': {}, 'segments': segmentos}
+        _cache[key[0]] = entry
+
+    return entry
+
+def load_data(path=DATA_PATH):
+    """ Carrega e limpa o dataset uma única vez por processo.
+
+    O resultado fica em cache enquanto a identidade do arquivo (ver
+    `source_key`) não mudar. A leitura em si usa o snapshot colunar quando
+    ele existe (ver `curry_company.snapshot`). O dataframe devolvido é
+    compartilhado entre páginas e sessões: os filtros das páginas criam
+    cópias com `.loc`, mas ele nunca deve ser alterado in-place.
+
+    Input: caminho do csv
+    Output: Dataframe tratado
+    """
+    return _load_entry(path)['df']
+
+def dataset_version(path=DATA_PATH):
+    """ Versão do dataset em cache (a `source_key` que o gerou), para
+    usar em chaves de cache de resultados derivados dos dados.
+    """
+    return _load_entry(path)['key']
+
+def load_derived(name, builder, path=DATA_PATH):
+    """ Objeto derivado do dataset, calculado uma vez por versão do arquivo.
+
+    Input:
+        - name: nome do derivado no cache
+        - builder: função que recebe o dataframe tratado e monta o objeto
+        - path: caminho do csv
+    Output: o objeto montado por `builder`
+    """
+    with _lock:
+        entry = _load_entry(path)
+        if name in entry['derived']:
+            _stats['hits'] += 1
+        else:
+            _stats['misses'] += 1
+            entry['derived'][name] = builder(entry['df'])
+
+        return entry['derived'][name]
+
+def load_cube(path=DATA_PATH):
+    """ Cubo de agregados do dataset (ver `aggregates.build_cube`). """
+    return load_derived('cube', build_cube, path)
+
+def load_date_index(path=DATA_PATH):
+    """ Índice data -> posição no dataframe ordenado (ver `date_index`). """
+    return load_derived('date_index', build_date_index, path)
+
+def load_prefix_sums(path=DATA_PATH):
+    """ Somas acumuladas por data do cubo (ver `date_index`). """
+    return load_derived('prefix_sums', lambda df1: build_prefix_sums(load_cube(path)), path)
+
+def load_courier_cells(path=DATA_PATH):
+    """ Células por entregador (ver `aggregates.build_courier_cells`). """
+    return load_derived('courier_cells', build_courier_cells, path)
+
+def load_distinct(path=DATA_PATH):
+    """ Esboços de entregadores distintos por célula (ver `distinct`). """
+    return load_derived('distinct', build_distinct, path)
+
+def load_quantiles(name, path=DATA_PATH):
+    """ Esboço de quantis `name` de `quantiles.SKETCHES` ('time', 'latitude' ou 'longitude'). """
+    return load_derived(f'quantiles_{name}', lambda df1: build_sketch(df1, name), path)
+
+def _quantiles_updater(name):
+    return lambda esboco, batch, derived: add_quantiles(esboco, build_sketch(batch, name))
+
+def _update_date_index(date_index, batch, derived):
+    contagem = date_index.diff().fillna(date_index).add(batch['Order_Date'].value_counts(), fill_value=0)
+
+    return contagem.sort_index().cumsum().astype(date_index.dtype)
+
+# Como atualizar cada derivado quando um lote é anexado, sem varrer o
+# histórico: função(derivado atual, lote com colunas derivadas, derivados
+# já atualizados). Só as células que o lote toca são somadas (ver
+# `aggregates.add_cells`). Derivados sem entrada aqui são descartados e
+# montados de novo na próxima leitura.
+_UPDATERS = {
+    'cube': lambda cube, batch, derived: add_cells(cube, build_cube(batch)),
+    'courier_cells': lambda cells, batch, derived: add_cells(cells, build_courier_cells(batch)),
+    'date_index': _update_date_index,
+    'distinct': lambda esboco, batch, derived: merge_distinct(esboco, build_distinct(batch)),
+    'prefix_sums': lambda prefix_sums, batch, derived: add_prefix_sums(prefix_sums, build_cube(batch)),
+    **{f'quantiles_{name}': _quantiles_updater(name) for name in SKETCHES},
+}
+
+def _extend_entry(entry, key, batch, segments):
+    """ Entrada nova com o lote anexado: o lote entra na posição das suas
+    datas e os derivados são atualizados só com ele (ver `_UPDATERS`).
+    """
+    df1, batch = union_categories(entry['df'], add_derived_columns(batch))
+    df1 = insert_sorted(df1, batch)
+
+    derived = {}
+    for name, value in entry['derived'].items():
+        updater = _UPDATERS.get(name)
+        if updater is not None:
+            value = updater(value, batch, derived)
+            if value is not None:
+                derived[name] = value
+
+    return {'key': key, 'df': df1, 'derived': derived, 'segments': segments}
+
+def append_batch(path, batch, write):
+    """ Grava um lote já limpo e o anexa ao cache deste processo, em vez de
+    reler e limpar o arquivo inteiro na próxima leitura.
+
+    A gravação roda sob o lock do cache, então nenhuma sessão lê o arquivo
+    pela metade. Se a entrada em cache não era a versão do arquivo de antes
+    do lote, ela é descartada. Outros processos (um servidor rodando
+    enquanto `ingest` grava) pegam o lote pelo segmento do snapshot na
+    próxima leitura (ver `_load_entry`).
+
+    Input:
+        - path: caminho do csv
+        - batch: lote tratado pelo `clean_code`
+        - write: função sem argumentos que grava o lote no csv (e no
+          snapshot) e devolve se gravou um segmento do snapshot
+    """
+    with _lock:
+        previous_key = source_key(path)
+        segmento = write()
+        key = source_key(path)
+
+        entry = _cache.get(key[0])
+        if entry is None or entry['key'] != previous_key:
+            _cache.pop(key[0], None)
+            return
+
+        segments = entry['segments']
+        if segments is not None:
+            segments = (segments[0], segments[1] + 1) if segmento else None
+        _cache[key[0]] = _extend_entry(entry, key, batch, segments)
+
+def invalidate(path=None):
+    """ Remove do cache o arquivo informado, ou todos se `path` for None. """
+    with _lock:
+        if path is None:
+            _cache.clear()
+        else:
+            _cache.pop(os.path.realpath(path), None)
+        _stats['invalidations'] += 1
+
+def cache_stats():
+    """ Contadores de hits, misses e invalidações, e os arquivos em cache. """
+    with _lock:
+        stats = dict(_stats)
+        stats['entries'] = [entry['key'] for entry in _cache.values()]
+
+    return stats
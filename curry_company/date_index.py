@@ -0,0 +1,130 @@
+""" Índice por data para o filtro "Até qual valor?".
+
+O dataframe tratado fica ordenado por `Order_Date`, então "pedidos antes
+da data X" é sempre um prefixo das linhas: uma busca binária no índice de
+datas dá o tamanho do prefixo e o corte vira um `iloc` sem cópia.
+
+As somas acumuladas por data do cubo fazem o mesmo para os agregados: os
+totais até a data de corte são uma única linha da tabela acumulada.
+"""
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import numpy as np
+import pandas as pd
+
+# -----------------------------------
+# Funções
+# -----------------------------------
+def sort_by_date(df1):
+    """ Ordena por `Order_Date` mantendo a ordem original dentro da data.
+
+    O snapshot já é gravado em ordem (ver `snapshot`): nesse caso o
+    dataframe volta como está, sem cópia.
+    """
+    if df1['Order_Date'].is_monotonic_increasing:
+        return df1
+
+    return df1.sort_values('Order_Date', kind='stable', ignore_index=True)
+
+def insert_sorted(df1, batch):
+    """ Junta um lote ordenado por data ao dataframe ordenado, sem ordenar
+    de novo: cada linha do lote entra depois das linhas da mesma data, como
+    num sort estável de `df1` seguido do lote. No caso comum (o lote só tem
+    datas a partir da última) é só a concatenação.
+    """
+    posicoes = df1['Order_Date'].searchsorted(batch['Order_Date'], side='right')
+    juntos = pd.concat([df1, batch], ignore_index=True)
+    if len(posicoes) == 0 or posicoes[0] == len(df1):
+        return juntos
+
+    ordem = np.insert(np.arange(len(df1)), posicoes, np.arange(len(df1), len(juntos)))
+
+    return juntos.take(ordem).reset_index(drop=True)
+
+def build_date_index(df1):
+    """ Índice data -> quantidade de linhas até o fim daquela data.
+
+    Input: Dataframe tratado e ordenado por `Order_Date`
+    Output: Series indexada pelas datas distintas (ordenadas)
+    """
+    contagem = df1['Order_Date'].value_counts(sort=False).sort_index()
+
+    return contagem.cumsum()
+
+def date_offset(date_index, date_cutoff):
+    """ Quantidade de linhas com `Order_Date` < `date_cutoff`. """
+    posicao = date_index.index.searchsorted(pd.Timestamp(date_cutoff), side='left')
+
+    return int(date_index.iloc[posicao - 1]) if posicao else 0
+
+def rows_until(df1, date_index, date_cutoff):
+    """ Linhas anteriores à data de corte, como fatia do dataframe ordenado. """
+    return df1.iloc[:date_offset(date_index, date_cutoff)]
+
+def build_prefix_sums(cube):
+    """ Somas acumuladas por data de cada célula do cubo.
+
+    Output: Dataframe com uma linha por data e uma coluna por
+            (estatística, demais dimensões); a linha da data D tem os
+            totais de todos os pedidos até D, inclusive. Tudo fica em
+            float64 (um bloco só); `totals_until` volta as contagens
+            para inteiro.
+    """
+    dimensoes = [nome for nome in cube.index.names if nome != 'Order_Date']
+    por_data = cube.astype(np.float64).unstack(dimensoes, fill_value=0).sort_index()
+
+    return por_data.cumsum()
+
+def add_prefix_sums(prefix_sums, cube):
+    """ Soma às somas acumuladas as do cubo de um lote, sem remontar a
+    tabela a partir do cubo inteiro.
+    """
+    lote = build_prefix_sums(cube)
+
+    datas = prefix_sums.index
+    if not lote.index.isin(datas).all():
+        datas = datas.union(lote.index)
+    colunas = prefix_sums.columns
+    faltando = colunas.get_indexer(lote.columns) < 0
+    if faltando.any():
+        colunas = colunas.append(lote.columns[faltando])
+
+    # Depois da última data de cada tabela, o acumulado fica o mesmo
+    atual = _align_prefix_sums(prefix_sums, datas, colunas)
+    valores = atual.to_numpy(copy=True)
+    valores[:, colunas.get_indexer(lote.columns)] += _align_prefix_sums(lote, datas, lote.columns).to_numpy()
+
+    return pd.DataFrame(valores, index=datas, columns=colunas)
+
+def _align_prefix_sums(prefix_sums, datas, colunas):
+    """ Somas acumuladas nas datas e colunas pedidas (zero antes da primeira data). """
+    if not (prefix_sums.index.equals(datas) and prefix_sums.columns.equals(colunas)):
+        prefix_sums = prefix_sums.reindex(index=datas, columns=colunas).ffill().fillna(0)
+
+    return prefix_sums
+
+def totals_until(prefix_sums, date_cutoff, traffic_options=None):
+    """ Células do cubo somadas sobre todas as datas anteriores ao corte.
+
+    É o equivalente a `filter_cells` seguido de soma em `Order_Date`, mas
+    custa uma busca binária e a leitura de uma linha.
+
+    Output: células indexadas pelas dimensões do cubo, menos `Order_Date`
+    """
+    posicao = prefix_sums.index.searchsorted(pd.Timestamp(date_cutoff), side='left')
+    if posicao:
+        linha = prefix_sums.iloc[posicao - 1]
+    else:
+        linha = pd.Series(0, index=prefix_sums.columns)
+
+    celulas = linha.unstack(0)
+    celulas = celulas.loc[celulas['orders'] > 0, :]
+    if traffic_options is not None:
+        linhas_selecionadas = celulas.index.get_level_values('Road_traffic_density').isin(traffic_options)
+        celulas = celulas.loc[linhas_selecionadas, :]
+
+    inteiros = [coluna for coluna in celulas.columns if coluna == 'orders' or coluna.endswith('_n')]
+    celulas[inteiros] = celulas[inteiros].astype(np.int64)
+
+    return celulas
@@ -0,0 +1,219 @@
+""" Contagem de distintos mergeável (entregadores por período e filtro).
+
+Contagens exatas de distintos não são somáveis: os entregadores ativos de
+duas semanas não são a soma dos de cada semana. Aqui cada célula
+(data, cidade, trânsito) guarda um esboço dos IDs de entregador, e os
+esboços de várias células se juntam sem voltar às linhas, para qualquer
+combinação de filtros e de períodos.
+
+Dois modos:
+
+- HyperLogLog: `2**p` registradores de 1 byte por célula; juntar é o
+  máximo registrador a registrador. O erro relativo típico é
+  1.04 / sqrt(2**p); `p` sai do erro pedido (`CURRY_DISTINCT_ERROR`,
+  padrão 2%).
+- exato: cada célula guarda o conjunto dos hashes dos IDs e juntar é a
+  união. Usado quando o dataset tem até `CURRY_DISTINCT_EXACT_ROWS`
+  linhas (padrão 100 mil); um esboço exato vira HyperLogLog quando é
+  juntado a um que já é HyperLogLog.
+"""
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from curry_company.aggregates import filter_cells
+from curry_company.buckets import bucket_keys
+
+DISTINCT_DIMENSIONS = ['Order_Date', 'City', 'Road_traffic_density']
+
+DEFAULT_ERROR = float(os.environ.get('CURRY_DISTINCT_ERROR', '0.02'))
+EXACT_ROWS = int(os.environ.get('CURRY_DISTINCT_EXACT_ROWS', '100000'))
+
+# -----------------------------------
+# Funções
+# -----------------------------------
+def precision_for(error):
+    """ Menor `p` com erro típico 1.04 / sqrt(2**p) <= `error` (entre 4 e 16). """
+    return min(16, max(4, math.ceil(math.log2((1.04 / error) ** 2))))
+
+def hash_values(valores):
+    """ Hash de 64 bits de cada valor, calculado só nos valores distintos. """
+    codigos, unicos = pd.factorize(valores)
+
+    return pd.util.hash_array(np.asarray(unicos, dtype=object))[codigos]
+
+def cell_codes(df1, keys):
+    """ Célula de cada linha, combinando os códigos de cada chave em um
+    inteiro (bem mais rápido que fatorar um MultiIndex de tuplas).
+
+    Output: (célula de cada linha, Dataframe das células com a coluna `row`)
+    """
+    codigos, niveis = zip(*(pd.factorize(df1[chave]) for chave in keys))
+    tamanhos = [max(len(nivel), 1) for nivel in niveis]
+    linhas, combinados = pd.factorize(np.ravel_multi_index(codigos, tamanhos))
+
+    posicoes = np.unravel_index(combinados, tamanhos)
+    indice = pd.MultiIndex.from_arrays([np.asarray(nivel, dtype=object if nivel.dtype == 'category' else None)[posicao]
+                                        for nivel, posicao in zip(niveis, posicoes)], names=keys)
+
+    return linhas, pd.DataFrame({'row': np.arange(len(combinados))}, index=indice)
+
+def hll_registers(hashes, linhas, n_linhas, precision):
+    """ Registradores HyperLogLog de cada linha de esboço.
+
+    Input:
+        - hashes: hash de 64 bits de cada valor
+        - linhas: linha do esboço (célula) de cada valor
+    Output: array uint8 (n_linhas, 2**precision)
+    """
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    registrador = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+
+    # Posição do primeiro bit 1 nos 32 bits seguintes ao índice
+    resto = ((hashes << np.uint64(precision)) >> np.uint64(32)).astype(np.float64)
+    rank = np.where(resto > 0, 32 - np.floor(np.log2(np.maximum(resto, 1))), 33).astype(np.uint8)
+
+    registradores = np.zeros((n_linhas, 1 << precision), dtype=np.uint8)
+    posicao = np.asarray(linhas, dtype=np.int64) * (1 << precision) + registrador
+    maximos = pd.Series(rank).groupby(posicao).max()
+    registradores.reshape(-1)[maximos.index.to_numpy()] = maximos.to_numpy()
+
+    return registradores
+
+def hll_estimate(registradores):
+    """ Estimativa de distintos de cada linha de registradores. """
+    m = registradores.shape[1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    soma = np.exp2(-registradores.astype(np.float64)).sum(axis=1)
+    estimativa = alpha * m * m / soma
+
+    # Correção para poucos valores: contagem linear pelos registradores zerados
+    zerados = (registradores == 0).sum(axis=1)
+    linear = m * np.log(m / np.maximum(zerados, 1))
+
+    return np.where((estimativa <= 2.5 * m) & (zerados > 0), linear, estimativa)
+
+def build_distinct(df1, column='Delivery_person_ID', keys=DISTINCT_DIMENSIONS, error=DEFAULT_ERROR, exact=None):
+    """ Esboço de distintos de `column` por célula de `keys`.
+
+    Input:
+        - error: erro relativo típico do modo HyperLogLog
+        - exact: força o modo exato (True) ou HyperLogLog (False); None
+          escolhe pelo tamanho do dataset (ver `EXACT_ROWS`)
+    Output: dict com `cells` (Dataframe indexado por `keys` com a coluna
+            `row`, a linha do esboço de cada célula), `precision` e
+            `registers` (HyperLogLog) ou `sets` (exato)
+    """
+    if exact is None:
+        exact = len(df1) <= EXACT_ROWS
+
+    hashes = hash_values(df1[column])
+    linhas, celulas = cell_codes(df1, keys)
+
+    esboco = {'cells': celulas, 'precision': precision_for(error)}
+    if exact:
+        conjuntos = pd.Series(hashes).groupby(linhas).unique()
+        esboco['sets'] = [frozenset(conjuntos.get(i, ())) for i in range(len(celulas))]
+    else:
+        esboco['registers'] = hll_registers(hashes, linhas, len(celulas), esboco['precision'])
+
+    return esboco
+
+def to_registers(esboco):
+    """ Converte um esboço exato para HyperLogLog (sem perda em relação
+    ao que o HyperLogLog teria guardado das mesmas linhas).
+    """
+    if 'registers' in esboco:
+        return esboco
+
+    tamanhos = [len(conjunto) for conjunto in esboco['sets']]
+    hashes = np.fromiter((h for conjunto in esboco['sets'] for h in conjunto), dtype=np.uint64, count=sum(tamanhos))
+    linhas = np.repeat(np.arange(len(tamanhos)), tamanhos)
+    registradores = hll_registers(hashes, linhas, len(tamanhos), esboco['precision'])
+
+    return {'cells': esboco['cells'], 'precision': esboco['precision'], 'registers': registradores}
+
+def _reduce(esboco, grupos, n_grupos):
+    """ Junta as linhas do esboço que caem no mesmo grupo.
+
+    Input: esboço, grupo de cada célula (0..n_grupos-1) e quantidade de grupos
+    Output: registradores (n_grupos, m) ou lista de conjuntos
+    """
+    linhas = esboco['cells']['row'].to_numpy()
+    ordem = np.argsort(grupos, kind='stable')
+    grupos, linhas = np.asarray(grupos)[ordem], linhas[ordem]
+    limites = np.searchsorted(grupos, np.arange(n_grupos + 1))
+
+    if 'sets' in esboco:
+        return [frozenset().union(*(esboco['sets'][linha] for linha in linhas[limites[i]:limites[i + 1]]))
+                for i in range(n_grupos)]
+
+    registradores = np.zeros((n_grupos, esboco['registers'].shape[1]), dtype=np.uint8)
+    presentes = limites[:-1] < limites[1:]
+    if len(linhas):
+        reduzidos = np.maximum.reduceat(esboco['registers'][linhas], limites[:-1][presentes], axis=0)
+        registradores[presentes] = reduzidos
+
+    return registradores
+
+def merge_distinct(*partes):
+    """ Junta esboços de pedaços diferentes (por exemplo um lote anexado). """
+    partes = [parte for parte in partes if parte is not None]
+    if any('registers' in parte for parte in partes):
+        partes = [to_registers(parte) for parte in partes]
+
+    deslocamento = 0
+    celulas = []
+    for parte in partes:
+        celulas.append(parte['cells'].assign(row=parte['cells']['row'] + deslocamento))
+        deslocamento += len(parte['cells'])
+    celulas = pd.concat(celulas)
+
+    unido = {'cells': celulas, 'precision': partes[0]['precision']}
+    if 'registers' in partes[0]:
+        unido['registers'] = np.concatenate([parte['registers'] for parte in partes])
+    else:
+        unido['sets'] = [conjunto for parte in partes for conjunto in parte['sets']]
+
+    # Células com a mesma chave viram uma só
+    grupos, chaves = pd.factorize(celulas.index)
+    reduzido = _reduce(unido, grupos, len(chaves))
+    unido['cells'] = pd.DataFrame({'row': np.arange(len(chaves))},
+                                  index=pd.MultiIndex.from_tuples(chaves, names=celulas.index.names))
+    unido['registers' if 'registers' in unido else 'sets'] = reduzido
+
+    return unido
+
+def filter_distinct(esboco, date_cutoff=None, traffic_options=None, cities=None):
+    """ Os filtros da barra lateral aplicados às células do esboço. """
+    return dict(esboco, cells=filter_cells(esboco['cells'], date_cutoff, traffic_options, cities))
+
+def count_distinct(esboco, grupos=None):
+    """ Distintos por grupo de células.
+
+    Input: esboço e, opcionalmente, o rótulo do grupo de cada célula
+           (sem grupos: o total de todas as células)
+    Output: Series rótulo -> distintos (estimados no modo HyperLogLog)
+    """
+    if grupos is None:
+        grupos = np.zeros(len(esboco['cells']), dtype=np.int64)
+    codigos, rotulos = pd.factorize(grupos, sort=True)
+    reduzido = _reduce(esboco, codigos, len(rotulos))
+
+    if 'sets' in esboco:
+        contagem = [len(conjunto) for conjunto in reduzido]
+    else:
+        contagem = np.round(hll_estimate(reduzido)).astype(np.int64)
+
+    return pd.Series(contagem, index=rotulos)
+
+def distinct_by_bucket(esboco, granularity):
+    """ Distintos por período (chaves de `buckets`) das células do esboço. """
+    datas = esboco['cells'].index.get_level_values('Order_Date')
+
+    return count_distinct(esboco, bucket_keys(datas, granularity))
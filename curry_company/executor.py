@@ -0,0 +1,74 @@
+""" Execução em paralelo das seções independentes de uma página.
+
+As seções de uma página leem o mesmo dataframe/cubo filtrado e não
+dependem umas das outras, então são calculadas ao mesmo tempo em um pool
+de threads compartilhado pelo processo e só depois a página monta o
+layout. O tempo do rerun fica perto da seção mais lenta, e não da soma.
+
+Threads e não processos: o dataframe filtrado não precisa ser copiado
+para outro processo, e as partes pesadas (pandas, numpy, serialização do
+plotly em json) liberam o GIL boa parte do tempo. As tarefas não podem
+chamar `st.*`: só calculam, e quem desenha é o script da página.
+
+`CURRY_WORKERS` define o tamanho do pool (padrão: número de CPUs);
+`CURRY_WORKERS=1` executa tudo em sequência na thread do script.
+"""
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from curry_company.profiling import record_section
+
+MAX_WORKERS = int(os.environ.get('CURRY_WORKERS', os.cpu_count() or 1))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# -----------------------------------
+# Funções
+# -----------------------------------
+def worker_pool():
+    """ Pool de threads do processo, criado no primeiro uso. """
+    global _pool
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='curry-section')
+
+    return _pool
+
+def timed(tarefa):
+    inicio = time.perf_counter()
+    resultado = tarefa()
+
+    return resultado, (time.perf_counter() - inicio) * 1000
+
+def evaluate(tasks):
+    """ Calcula as seções em paralelo e espera todas terminarem.
+
+    Input:
+        - tasks: dict nome -> função sem argumentos (`functools.partial`)
+    Output: dict nome -> resultado, na mesma ordem de `tasks`
+
+    O tempo de cada tarefa entra no profiling como seção com o seu nome.
+    Se alguma tarefa falhar, a exceção é levantada aqui, depois de todas
+    terminarem.
+    """
+    if MAX_WORKERS <= 1 or len(tasks) <= 1:
+        tempos = {nome: timed(tarefa) for nome, tarefa in tasks.items()}
+    else:
+        pool = worker_pool()
+        futuros = {nome: pool.submit(timed, tarefa) for nome, tarefa in tasks.items()}
+        wait(futuros.values())
+        tempos = {nome: futuro.result() for nome, futuro in futuros.items()}
+
+    resultados = {}
+    for nome, (resultado, ms) in tempos.items():
+        record_section(nome, ms)
+        resultados[nome] = resultado
+
+    return resultados
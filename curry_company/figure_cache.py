@@ -0,0 +1,145 @@
+""" Cache LRU dos gráficos já montados, compartilhado pelo processo.
+
+A chave é (gráfico, versão do dataset, data de corte, opções de trânsito
+ordenadas), então qualquer sessão que abra uma página com os mesmos
+filtros (por exemplo os filtros padrão) reaproveita o gráfico pronto. O
+cache tem limite de entradas e de memória.
+
+Os gráficos do plotly ficam guardados como json: o tamanho do texto é o
+que conta no limite de memória, e cada hit monta uma figura nova com
+`plotly.io.from_json`, então quem recebe pode alterá-la.
+"""
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from curry_company.data import dataset_version
+from curry_company.scaffold import lazy_module
+
+pio = lazy_module('plotly.io')
+
+MAX_ENTRIES = 256
+MAX_BYTES = int(os.environ.get('CURRY_FIGURE_CACHE_MB', '64')) * 1024 * 1024
+
+_figures = OrderedDict()
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'bytes': 0}
+_lock = threading.Lock()
+
+# -----------------------------------
+# Funções
+# -----------------------------------
+def filter_key(path, date_cutoff, traffic_options, cities=None):
+    """ Estado dos filtros da barra lateral (e do filtro de cidades, usado
+    pelo relatório em lote) para as chaves de cache.
+    """
+    chave = (dataset_version(path), pd.Timestamp(date_cutoff), tuple(sorted(traffic_options)))
+
+    return chave if cities is None else chave + (tuple(sorted(cities)),)
+
+class FigureJson(str):
+    """ Json de um gráfico do plotly guardado no cache. """
+
+def pack_figure(figure):
+    """ O que vai para o cache: gráficos do plotly viram `FigureJson`; nos
+    resultados de uma aba (dict), cada valor é convertido.
+    """
+    if isinstance(figure, dict):
+        return {nome: pack_figure(valor) for nome, valor in figure.items()}
+
+    if hasattr(figure, 'to_plotly_json'):
+        return FigureJson(figure.to_json())
+
+    return figure
+
+def unpack_figure(guardado):
+    """ Desfaz o `pack_figure`, montando gráficos novos a partir do json. """
+    if isinstance(guardado, dict):
+        return {nome: unpack_figure(valor) for nome, valor in guardado.items()}
+
+    if isinstance(guardado, FigureJson):
+        # o orjson do plotly não aceita subclasses de str
+        return pio.from_json(str(guardado))
+
+    return guardado
+
+def figure_size(figure):
+    """ Tamanho aproximado em bytes de um valor já convertido pelo
+    `pack_figure`: o texto (json ou HTML do mapa), a memória das tabelas
+    ou, para os resultados de uma aba, a soma.
+    """
+    if isinstance(figure, str):
+        return len(figure)
+
+    if isinstance(figure, dict):
+        return sum(figure_size(valor) for valor in figure.values())
+
+    if isinstance(figure, pd.DataFrame):
+        return int(figure.memory_usage(deep=True).sum())
+
+    if isinstance(figure, pd.Series):
+        return int(figure.memory_usage(deep=True))
+
+    return sys.getsizeof(figure)
+
+def cached_figure(name, key, builder, *args, **kwargs):
+    """ Devolve o gráfico em cache ou monta com `builder(*args, **kwargs)`.
+
+    Input:
+        - name: nome do gráfico na chave
+        - key: estado dos filtros (ver `filter_key`); os argumentos
+          posicionais (os dados filtrados) não entram na chave, então
+          precisam ser determinados por ela
+        - builder: função que monta o gráfico
+        - kwargs: parâmetros pequenos do gráfico, que entram na chave
+    Output: o gráfico; tabelas e textos são compartilhados e não devem
+            ser alterados, gráficos do plotly são cópias
+    """
+    chave = (name, key, tuple(sorted(kwargs.items())))
+
+    with _lock:
+        guardado = _figures.get(chave)
+        if guardado is not None:
+            _figures.move_to_end(chave)
+            _stats['hits'] += 1
+        else:
+            _stats['misses'] += 1
+    if guardado is not None:
+        return unpack_figure(guardado[0])
+
+    figure = builder(*args, **kwargs)
+    guardado = pack_figure(figure)
+    tamanho = figure_size(guardado)
+
+    with _lock:
+        if chave not in _figures:
+            _figures[chave] = (guardado, tamanho)
+            _stats['bytes'] += tamanho
+
+        while _figures and (len(_figures) > MAX_ENTRIES or _stats['bytes'] > MAX_BYTES):
+            _, (_, removido) = _figures.popitem(last=False)
+            _stats['bytes'] -= removido
+            _stats['evictions'] += 1
+
+    return figure
+
+def clear_figures():
+    with _lock:
+        _figures.clear()
+        _stats['bytes'] = 0
+
+def figure_cache_stats():
+    """ Hits, misses, taxa de acerto, evicções, entradas e bytes em uso. """
+    with _lock:
+        stats = dict(_stats)
+        stats['entries'] = len(_figures)
+
+    total = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / total if total else 0.0
+
+    return stats
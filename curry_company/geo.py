@@ -0,0 +1,88 @@
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import numpy as np
+import pandas as pd
+
+# Raio médio da Terra em km, o mesmo usado pelo pacote `haversine`
+EARTH_RADIUS_KM = 6371.0088
+
+DISTANCE_COLUMNS = ['Restaurant_latitude', 'Restaurant_longitude', 'Delivery_location_latitude', 'Delivery_location_longitude']
+
+# -----------------------------------
+# Funções
+# -----------------------------------
+def haversine_np(lat1, lon1, lat2, lon2):
+    """ Distância de grande círculo (km) entre arrays de coordenadas em graus.
+
+    Os quatro argumentos podem ser escalares ou arrays de qualquer formato
+    compatível com broadcast do NumPy.
+    """
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+
+    d = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(d))
+
+def delivery_distance(df1):
+    """ Distância restaurante -> local de entrega de cada pedido, em km. """
+    colunas = [df1[coluna].to_numpy(dtype=float) for coluna in DISTANCE_COLUMNS]
+
+    return haversine_np(*colunas)
+
+def add_distance(df1):
+    """ Grava a distância de cada pedido na coluna derivada `distance`. """
+    df1['distance'] = delivery_distance(df1).astype(np.float32)
+
+    return df1
+
+def pairwise_distance(origens, destinos, batch_size=4096):
+    """ Matriz de distâncias (km) entre dois conjuntos de pontos.
+
+    Input:
+        - origens: array (n, 2) de (latitude, longitude)
+        - destinos: array (m, 2) de (latitude, longitude)
+        - batch_size: quantas origens calcular por vez, limitando a memória
+          intermediária a batch_size x m
+    Output: array (n, m)
+    """
+    origens = np.asarray(origens, dtype=float).reshape(-1, 2)
+    destinos = np.asarray(destinos, dtype=float).reshape(-1, 2)
+
+    resultado = np.empty((len(origens), len(destinos)))
+    for inicio in range(0, len(origens), batch_size):
+        lote = origens[inicio:inicio + batch_size]
+        resultado[inicio:inicio + batch_size] = haversine_np(lote[:, 0, None], lote[:, 1, None],
+                                                             destinos[None, :, 0], destinos[None, :, 1])
+
+    return resultado
+
+def distance_by_city(df1):
+    """ Distância dos pedidos de cada cidade em células somáveis, no formato
+    de `aggregates.summarize`: `distance_n` (pedidos com distância) e
+    `distance_sum`, com as cidades em ordem alfabética.
+    """
+    # Soma em float64, como o TOTAL do sqlite, e não na precisão da coluna
+    celulas = (df1['distance'].astype(np.float64)
+               .groupby(df1['City'], observed=True)
+               .agg(distance_n='count', distance_sum='sum'))
+    celulas.index = celulas.index.astype(object)
+
+    return celulas.sort_index()
+
+def bin_locations(lat, lon, cell_deg):
+    """ Agrupa pontos em uma grade regular de `cell_deg` graus.
+
+    Input: arrays de latitude e longitude e o tamanho da célula em graus
+    Output: Dataframe com o centro de cada célula ocupada (`lat`, `lon`) e
+            a quantidade de pontos nela (`orders`)
+    """
+    linha = np.floor(np.asarray(lat, dtype=float) / cell_deg).astype(np.int64)
+    coluna = np.floor(np.asarray(lon, dtype=float) / cell_deg).astype(np.int64)
+
+    celulas = pd.DataFrame({'linha': linha, 'coluna': coluna}).value_counts().rename('orders').reset_index()
+    celulas['lat'] = (celulas['linha'] + 0.5) * cell_deg
+    celulas['lon'] = (celulas['coluna'] + 0.5) * cell_deg
+
+    return celulas.loc[:, ['lat', 'lon', 'orders']]
@@ -0,0 +1,92 @@
+""" Anexa um lote de pedidos novos ao dataset.
+
+Uso:
+    python -m curry_company.ingest lote.csv [--path train.csv]
+
+O lote precisa ter as mesmas colunas do `train.csv`. Só o lote passa pelo
+`clean_code`; as linhas brutas vão para o final do csv, o lote limpo vira
+um segmento do snapshot colunar e, no processo atual, o dataframe em cache
+e os derivados (cubo, índice de datas...) são atualizados sem reler o
+histórico (ver `data.append_batch`).
+
+Rodando pela linha de comando, o `ingest` é outro processo: o servidor do
+dashboard não vê o lote na hora, mas na próxima leitura percebe que o csv
+mudou e lê só os segmentos novos do snapshot, sem reler o histórico. Se o
+snapshot não estava em dia com o csv (por exemplo, o csv foi editado à
+mão), não há segmento e o servidor relê tudo.
+"""
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import argparse
+import os
+
+import pandas as pd
+
+from curry_company import data, snapshot
+from curry_company.cleaning import clean_code
+
+# -----------------------------------
+# Funções
+# -----------------------------------
+def ends_with_newline(path):
+    with open(path, 'rb') as arquivo:
+        arquivo.seek(0, os.SEEK_END)
+        if arquivo.tell() == 0:
+            return True
+        arquivo.seek(-1, os.SEEK_END)
+
+        return arquivo.read(1) == b'\n'
+
+def append_batch(raw, path=data.DATA_PATH):
+    """ Anexa um lote bruto (mesmo formato do csv) ao dataset.
+
+    Input:
+        - raw: Dataframe bruto, como lido pelo `pd.read_csv`
+        - path: caminho do csv do dataset
+    Output: lote tratado
+    """
+    colunas = list(pd.read_csv(path, nrows=0).columns)
+    if list(raw.columns) != colunas:
+        raise ValueError(f'O lote precisa ter as colunas {colunas}, recebeu {list(raw.columns)}')
+
+    # O segmento do snapshot guarda o lote ordenado e já com a distância
+    batch = data.add_derived_columns(clean_code(raw))
+
+    def gravar():
+        snapshot_atualizado = snapshot.snapshot_is_fresh(path)
+
+        # O csv pode terminar sem quebra de linha na última linha
+        if not ends_with_newline(path):
+            with open(path, 'ab') as arquivo:
+                arquivo.write(b'\n')
+        raw.to_csv(path, mode='a', header=False, index=False)
+
+        # O segmento só é gravado se o snapshot estava em dia com o csv de
+        # antes do lote; senão ele será refeito inteiro na próxima leitura.
+        if snapshot_atualizado:
+            info = os.stat(path)
+            source = {'mtime_ns': info.st_mtime_ns, 'size': info.st_size, 'sha256': None}
+            snapshot.append_segment(batch, path, source)
+
+        return snapshot_atualizado
+
+    data.append_batch(path, batch, gravar)
+
+    return batch
+
+def append_batch_file(batch_path, path=data.DATA_PATH):
+    """ Lê um arquivo de lote e anexa ao dataset (ver `append_batch`). """
+    return append_batch(pd.read_csv(batch_path), path)
+
+def main():
+    parser = argparse.ArgumentParser(description='Anexa um lote de pedidos ao dataset')
+    parser.add_argument('batch_path')
+    parser.add_argument('--path', default=data.DATA_PATH)
+    args = parser.parse_args()
+
+    batch = append_batch_file(args.batch_path, args.path)
+    print(f'{len(batch)} pedidos válidos anexados a {args.path}')
+
+if __name__ == '__main__':
+    main()
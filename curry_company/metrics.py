@@ -0,0 +1,346 @@
+""" Métricas de cada página, sem Streamlit.
+
+`FilteredView` junta o dataset e os agregados já filtrados pela barra
+lateral (data de corte, trânsito e, opcionalmente, cidades); cada parte é
+filtrada só na primeira vez que alguma métrica pede por ela. As funções
+`*_tasks` descrevem as seções de cada aba das páginas como funções sem
+argumentos, no formato de `executor.evaluate`: as páginas desenham os
+resultados e o relatório em lote (`curry_company.report`) grava os mesmos
+resultados em json e HTML.
+
+`filtered_view` guarda as views em um cache LRU do processo, pela chave
+dos filtros (versão do dataset, data de corte, trânsito e cidades): as
+três páginas abertas com os mesmos filtros, por qualquer sessão, usam a
+mesma view e filtram os agregados uma vez só. As linhas filtradas não
+ficam guardadas na view, só os resultados pequenos calculados a partir
+delas, então cada view em memória custa pouco. O limite de views em
+memória é `CURRY_VIEW_CACHE` (padrão 8).
+
+`CURRY_BACKEND=sqlite` troca o dataset em memória pelo banco de
+`sqlite_store`: `SqliteView` tem a mesma interface, mas filtra e agrega
+no banco.
+"""
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+import pandas as pd
+
+from curry_company import sqlite_store
+from curry_company.aggregates import CUBE_DIMENSIONS, filter_cells
+from curry_company.charts import (MAP_GRID_DEG, avg_std_time_by_order_type, avg_std_time_delivery, avg_std_time_graph,
+                                  avg_std_time_on_traffic, country_map_html, distance, location_medians,
+                                  order_by_week, order_metric, order_share_by_week, ratings_by,
+                                  time_percentiles_graph, top_delivers, traffic_order_city, traffic_order_share)
+from curry_company.courier_table import courier_profile, profile_from_sums
+from curry_company.data import (DATA_PATH, load_courier_cells, load_cube, load_data, load_date_index,
+                                load_distinct, load_prefix_sums, load_quantiles)
+from curry_company.date_index import rows_until, totals_until
+from curry_company.distinct import count_distinct, filter_distinct
+from curry_company.figure_cache import filter_key
+from curry_company.geo import bin_locations, distance_by_city
+from curry_company.quantiles import PERCENTILE_DIMENSIONS, filter_quantiles
+
+# 'pandas' (dataset em memória) ou 'sqlite' (ver `sqlite_store`)
+BACKEND = os.environ.get('CURRY_BACKEND', 'pandas')
+
+MAX_VIEWS = int(os.environ.get('CURRY_VIEW_CACHE', '8'))
+
+# Colunas com mínimo e máximo na Visão Entregadores
+EXTREME_COLUMNS = ['Delivery_person_Age', 'Vehicle_condition']
+
+_views = OrderedDict()
+_view_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+_views_lock = threading.Lock()
+
+# Abas de cada página, na ordem da tela
+PAGE_TABS = {
+    'empresa': ['Visão Gerencial', 'Visão Tática', 'Visão Geográfica'],
+    'entregadores': ['Visão Gerencial', '_', '_'],
+    'restaurantes': ['Visão Gerencial', '_', '_'],
+}
+
+# -----------------------------------
+# Filtros
+# -----------------------------------
+def view_property(func):
+    """ Atributo calculado uma vez por view, como `functools.cached_property`.
+
+    O `cached_property` do Python 3.11 usa um lock por atributo da classe,
+    compartilhado por todas as instâncias: a primeira view a calcular o
+    cubo trava o cubo de todas as outras sessões. Aqui o lock é da view e
+    do atributo, então views diferentes (e atributos diferentes da mesma
+    view, pedidos pelo pool de `executor`) calculam em paralelo.
+    """
+    nome = func.__name__
+
+    @wraps(func)
+    def atributo(self):
+        valores = self._valores
+        if nome not in valores:
+            with self._lock(nome):
+                if nome not in valores:
+                    valores[nome] = func(self)
+
+        return valores[nome]
+
+    return property(atributo)
+
+class FilteredView:
+    """ Dataset e agregados com os filtros da barra lateral aplicados. """
+
+    def __init__(self, date_cutoff, traffic_options, cities=None, path=DATA_PATH):
+        self.path = path
+        self.date_cutoff = pd.Timestamp(date_cutoff)
+        self.traffic_options = list(traffic_options)
+        self.cities = None if cities is None else list(cities)
+        self._valores = {}
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _lock(self, nome):
+        """ Lock do atributo `nome` desta view (ver `view_property`). """
+        with self._locks_lock:
+            return self._locks.setdefault(nome, threading.Lock())
+
+    @view_property
+    def key(self):
+        """ Estado dos filtros, usado como chave do cache de gráficos. """
+        return filter_key(self.path, self.date_cutoff, self.traffic_options, self.cities)
+
+    def _cells(self, celulas):
+        return filter_cells(celulas, self.date_cutoff, self.traffic_options, self.cities)
+
+    @property
+    def rows(self):
+        """ Linhas filtradas, refeitas a cada uso: a view fica no cache de
+        `filtered_view` e não deve segurar uma cópia do histórico.
+        """
+        # Filtro de data: as linhas estão ordenadas por data, então é uma fatia
+        df1 = rows_until(load_data(self.path), load_date_index(self.path), self.date_cutoff)
+
+        # Com todo o trânsito e todas as cidades, a fatia já é a seleção: sem cópia
+        trafego = df1['Road_traffic_density']
+        todo_trafego = not trafego.hasnans and set(trafego.cat.categories) <= set(self.traffic_options)
+        if todo_trafego and self.cities is None:
+            return df1
+
+        linhas_selecionadas = trafego.isin(self.traffic_options)
+        if self.cities is not None:
+            linhas_selecionadas &= df1['City'].isin(self.cities)
+
+        return df1.loc[linhas_selecionadas, :]
+
+    @view_property
+    def cube(self):
+        """ Cubo por data, para as séries diárias. """
+        return self._cells(load_cube(self.path))
+
+    @view_property
+    def totals(self):
+        """ Totais acumulados até a data de corte, para o resto. """
+        totals = totals_until(load_prefix_sums(self.path), self.date_cutoff, self.traffic_options)
+
+        return filter_cells(totals, cities=self.cities)
+
+    @view_property
+    def couriers(self):
+        """ Esboço de entregadores distintos (ver `distinct`). """
+        return filter_distinct(load_distinct(self.path), self.date_cutoff, self.traffic_options, self.cities)
+
+    @view_property
+    def courier_profile(self):
+        """ Perfil de cada entregador (ver `courier_table.courier_profile`). """
+        return courier_profile(self._cells(load_courier_cells(self.path)))
+
+    def quantiles(self, name):
+        """ Esboço de quantis `name` (ver `quantiles.SKETCHES`). """
+        return filter_quantiles(load_quantiles(name, self.path), self.date_cutoff, self.traffic_options, self.cities)
+
+    @view_property
+    def extremes(self):
+        """ Mínimo e máximo de `EXTREME_COLUMNS` (linhas `min` e `max`). """
+        return self.rows[EXTREME_COLUMNS].agg(['min', 'max'])
+
+    @view_property
+    def distances(self):
+        """ Distância por cidade (ver `geo.distance_by_city`). """
+        return distance_by_city(self.rows)
+
+    def location_cells(self, cell_deg=MAP_GRID_DEG):
+        """ Entregas por célula da grade do mapa (ver `geo.bin_locations`). """
+        df1 = self.rows
+
+        return bin_locations(df1['Delivery_location_latitude'], df1['Delivery_location_longitude'], cell_deg)
+
+    def top_delivers(self, k=10, metric='max'):
+        """ Ranking de entregadores por cidade (ver `charts.top_delivers`). """
+        return top_delivers(self.rows, k, metric)
+
+class SqliteView(FilteredView):
+    """ `FilteredView` com os filtros e as agregações feitos no banco. """
+
+    @view_property
+    def key(self):
+        chave = (sqlite_store.database_version(self.path), self.date_cutoff, tuple(sorted(self.traffic_options)))
+
+        return chave if self.cities is None else chave + (tuple(sorted(self.cities)),)
+
+    @property
+    def _filters(self):
+        return {'date_cutoff': self.date_cutoff, 'traffic_options': self.traffic_options,
+                'cities': self.cities, 'path': self.path}
+
+    @property
+    def rows(self):
+        return sqlite_store.rows_sql(**self._filters)
+
+    @view_property
+    def cube(self):
+        return sqlite_store.summarize_sql(CUBE_DIMENSIONS, **self._filters)
+
+    @view_property
+    def totals(self):
+        return sqlite_store.summarize_sql([chave for chave in CUBE_DIMENSIONS if chave != 'Order_Date'],
+                                          **self._filters)
+
+    @view_property
+    def couriers(self):
+        return sqlite_store.distinct_sql(**self._filters)
+
+    @view_property
+    def courier_profile(self):
+        return profile_from_sums(sqlite_store.courier_sums_sql(**self._filters))
+
+    def quantiles(self, name):
+        return sqlite_store.quantiles_sql(name, **self._filters)
+
+    @view_property
+    def extremes(self):
+        return sqlite_store.extremes_sql(EXTREME_COLUMNS, **self._filters)
+
+    @view_property
+    def distances(self):
+        return sqlite_store.distance_sql(**self._filters)
+
+    def location_cells(self, cell_deg=MAP_GRID_DEG):
+        return sqlite_store.location_cells_sql(cell_deg, **self._filters)
+
+    def top_delivers(self, k=10, metric='max'):
+        return sqlite_store.top_delivers_sql(k, metric, **self._filters)
+
+def filtered_view(date_cutoff, traffic_options, cities=None, path=DATA_PATH):
+    """ View do backend configurado em `CURRY_BACKEND`, compartilhada por
+    páginas e sessões com os mesmos filtros.
+    """
+    classe = SqliteView if BACKEND == 'sqlite' else FilteredView
+    view = classe(date_cutoff, traffic_options, cities, path)
+
+    # A chave inclui a versão do dataset: um csv novo não reaproveita views velhas
+    chave = view.key
+    with _views_lock:
+        if chave in _views:
+            _views.move_to_end(chave)
+            _view_stats['hits'] += 1
+            return _views[chave]
+
+        _view_stats['misses'] += 1
+        _views[chave] = view
+        while len(_views) > MAX_VIEWS:
+            _views.popitem(last=False)
+            _view_stats['evictions'] += 1
+
+    return view
+
+def clear_views():
+    with _views_lock:
+        _views.clear()
+
+def view_cache_stats():
+    """ Hits, misses, evicções e views em memória. """
+    with _views_lock:
+        return dict(_view_stats, entries=len(_views))
+
+def load_backend(path=DATA_PATH):
+    """ Carrega o dataset (pandas) ou garante o banco em dia (sqlite). """
+    if BACKEND == 'sqlite':
+        return sqlite_store.ensure_database(path)
+
+    return load_data(path)
+
+def available_cities(path=DATA_PATH):
+    if BACKEND == 'sqlite':
+        return sqlite_store.cities_sql(path)
+
+    return sorted(load_data(path)['City'].dropna().unique())
+
+# -----------------------------------
+# Seções de cada aba
+# -----------------------------------
+def empresa_tasks(tab, view, granularity='week'):
+    if tab == 'Visão Gerencial':
+        return {
+            'order_metric': lambda: order_metric(view.cube),
+            'traffic_order_share': lambda: traffic_order_share(view.totals),
+            'traffic_order_city': lambda: traffic_order_city(view.totals),
+        }
+
+    if tab == 'Visão Tática':
+        return {
+            'order_by_week': lambda: order_by_week(view.cube, granularity),
+            'order_share_by_week': lambda: order_share_by_week(view.cube, view.couriers, granularity),
+        }
+
+    if tab == 'Visão Geográfica':
+        return {
+            'country_map': lambda: country_map_html(view.location_cells(),
+                                                    location_medians(view.quantiles('latitude'),
+                                                                     view.quantiles('longitude'))),
+        }
+
+    return {}
+
+def entregadores_tasks(tab, view):
+    if tab == 'Visão Gerencial':
+        return {
+            'oldest': lambda: view.extremes.loc['max', 'Delivery_person_Age'],
+            'youngest': lambda: view.extremes.loc['min', 'Delivery_person_Age'],
+            'best_condition': lambda: view.extremes.loc['max', 'Vehicle_condition'],
+            'worst_condition': lambda: view.extremes.loc['min', 'Vehicle_condition'],
+            'courier_profile': lambda: view.courier_profile,
+            'ratings_by_traffic': lambda: ratings_by(view.totals, 'Road_traffic_density'),
+            'ratings_by_weather': lambda: ratings_by(view.totals, 'Weatherconditions'),
+            'top_delivers': lambda: view.top_delivers(),
+        }
+
+    return {}
+
+def restaurantes_tasks(tab, view):
+    if tab == 'Visão Gerencial':
+        return {
+            # Um grupo só; sem células na seleção a Series vem vazia e a soma é 0
+            'unique_couriers': lambda: int(count_distinct(view.couriers).sum()),
+            'avg_distance': lambda: distance(view.distances, fig=False),
+            'avg_time_festival': lambda: avg_std_time_delivery(view.totals, 'Yes', 'avg_time'),
+            'std_time_festival': lambda: avg_std_time_delivery(view.totals, 'Yes', 'std_time'),
+            'avg_time': lambda: avg_std_time_delivery(view.totals, 'No', 'avg_time'),
+            'std_time': lambda: avg_std_time_delivery(view.totals, 'No', 'std_time'),
+            'distance': lambda: distance(view.distances, fig=True),
+            'avg_std_time_graph': lambda: avg_std_time_graph(view.totals),
+            'avg_std_time_on_traffic': lambda: avg_std_time_on_traffic(view.totals),
+            'avg_std_time_by_order_type': lambda: avg_std_time_by_order_type(view.totals),
+            'time_percentiles': lambda: {coluna: time_percentiles_graph(view.quantiles('time'), coluna)
+                                         for coluna in PERCENTILE_DIMENSIONS},
+        }
+
+    return {}
+
+PAGE_TASKS = {
+    'empresa': empresa_tasks,
+    'entregadores': entregadores_tasks,
+    'restaurantes': restaurantes_tasks,
+}
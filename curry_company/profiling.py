@@ -0,0 +1,136 @@
+""" Medição do tempo de cada seção das páginas.
+
+Ligado com a variável de ambiente `CURRY_PROFILE=1` ou com `?profile=1`
+na URL. Com a medição ligada, cada rerun mostra na barra lateral um painel
+recolhível com o tempo de cada seção e grava uma linha json em
+`CURRY_PROFILE_LOG` (padrão `profile.jsonl`). Desligada, `section` não
+faz nada além de um `if`.
+
+Resumo do log (p50/p95 por página e seção):
+    python -m curry_company.profiling [profile.jsonl]
+"""
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+LOG_PATH = os.environ.get('CURRY_PROFILE_LOG', 'profile.jsonl')
+
+# Cada sessão do Streamlit roda o script na sua própria thread, então o
+# estado do rerun atual fica em um threading.local
+_run = threading.local()
+_log_lock = threading.Lock()
+
+# -----------------------------------
+# Funções
+# -----------------------------------
+def profiling_enabled():
+    """ Medição ligada pela variável de ambiente ou pela query `profile`. """
+    if os.environ.get('CURRY_PROFILE', '') not in ('', '0'):
+        return True
+
+    import streamlit as st
+    valor = st.experimental_get_query_params().get('profile', ['0'])[0]
+
+    return valor not in ('', '0')
+
+def start_run(page):
+    """ Começa a medição de um rerun da página. Chamar no início do script. """
+    _run.page = page
+    _run.enabled = profiling_enabled()
+    _run.sections = []
+    _run.start = time.perf_counter()
+
+@contextmanager
+def section(name):
+    """ Mede o bloco `with` como uma seção do rerun atual. """
+    if not getattr(_run, 'enabled', False):
+        yield
+        return
+
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        _run.sections.append((name, (time.perf_counter() - inicio) * 1000))
+
+def record_section(name, ms):
+    """ Registra uma seção medida fora do `with section` (por exemplo em
+    uma thread do pool de `executor`).
+    """
+    if getattr(_run, 'enabled', False):
+        _run.sections.append((name, ms))
+
+def write_log(registro, path=LOG_PATH):
+    with _log_lock:
+        with open(path, 'a', encoding='utf-8') as arquivo:
+            arquivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+
+def finish_run():
+    """ Fecha o rerun: mostra o painel na barra lateral e grava o log.
+    Chamar no final do script.
+    """
+    if not getattr(_run, 'enabled', False):
+        return
+
+    import pandas as pd
+    import streamlit as st
+
+    from curry_company.figure_cache import figure_cache_stats
+    from curry_company.metrics import view_cache_stats
+
+    total = (time.perf_counter() - _run.start) * 1000
+
+    # Seções repetidas no mesmo rerun são somadas
+    secoes = {}
+    for nome, ms in _run.sections:
+        secoes[nome] = secoes.get(nome, 0) + ms
+
+    registro = {
+        'timestamp': datetime.now().isoformat(timespec='milliseconds'),
+        'page': _run.page,
+        'total_ms': round(total, 2),
+        'sections': {nome: round(ms, 2) for nome, ms in secoes.items()},
+    }
+    write_log(registro)
+
+    with st.sidebar.expander('Profiling', expanded=False):
+        st.metric('Rerun (ms)', f'{total:.1f}')
+        tempos = pd.DataFrame(list(secoes.items()), columns=['seção', 'ms'])
+        st.dataframe(tempos.round(1))
+
+        figuras = figure_cache_stats()
+        st.caption(f"Cache de gráficos: {figuras['hits']} hits, {figuras['misses']} misses "
+                   f"({figuras['hit_rate']:.0%}), {figuras['entries']} gráficos, {figuras['bytes'] / 1024:.0f} KB")
+
+        views = view_cache_stats()
+        st.caption(f"Views filtradas: {views['hits']} hits, {views['misses']} misses, "
+                   f"{views['entries']} em memória, {views['evictions']} evicções")
+
+    _run.enabled = False
+
+def summarize_log(path=LOG_PATH):
+    """ p50 e p95 do tempo de cada seção (e do rerun inteiro) por página. """
+    import pandas as pd
+
+    linhas = []
+    with open(path, encoding='utf-8') as arquivo:
+        for linha in arquivo:
+            registro = json.loads(linha)
+            linhas.append((registro['page'], 'total', registro['total_ms']))
+            linhas.extend((registro['page'], nome, ms) for nome, ms in registro['sections'].items())
+
+    tempos = pd.DataFrame(linhas, columns=['page', 'section', 'ms'])
+
+    return (tempos.groupby(['page', 'section'])['ms']
+            .describe(percentiles=[0.5, 0.95])
+            .loc[:, ['count', '50%', '95%', 'max']])
+
+if __name__ == '__main__':
+    print(summarize_log(sys.argv[1] if len(sys.argv) > 1 else LOG_PATH).round(1).to_string())
@@ -0,0 +1,126 @@
+""" Esboços de quantis mergeáveis (percentis do tempo e medianas do mapa).
+
+Cada esboço é um histograma esparso: para cada célula das dimensões de
+filtro, a contagem de valores em cada faixa (`bin`). Contagens são
+aditivas, então o esboço passa pelas mesmas funções do cubo
+(`filter_cells`, `merge_cells`, `rollup`) e os quantis de qualquer
+seleção saem das faixas, sem ordenar as linhas.
+
+Dois tipos de faixa, conforme a precisão que a medida precisa:
+
+- 'log' (DDSketch): faixas geométricas com erro relativo máximo
+  `accuracy` no valor do quantil (tempo de entrega; padrão 1%, ajustável
+  em `CURRY_QUANTILE_ACCURACY`). Menos erro = mais faixas por célula.
+- 'linear': faixas de largura fixa, erro absoluto de meia faixa
+  (coordenadas; padrão 0.0005 grau, ~50 m).
+"""
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import os
+
+import numpy as np
+import pandas as pd
+
+from curry_company.aggregates import add_cells, filter_cells, merge_cells
+
+QUANTILE_ACCURACY = float(os.environ.get('CURRY_QUANTILE_ACCURACY', '0.01'))
+LOCATION_RESOLUTION = 0.0005
+
+# Dimensões das células de tempo: as do filtro e as dos percentis
+PERCENTILE_DIMENSIONS = ['City', 'Road_traffic_density', 'Weatherconditions', 'Festival']
+TIME_DIMENSIONS = ['Order_Date'] + PERCENTILE_DIMENSIONS
+LOCATION_DIMENSIONS = ['Order_Date', 'City', 'Road_traffic_density']
+
+# Esboços montados no carregamento: nome -> (coluna, dimensões, faixa, parâmetro)
+SKETCHES = {
+    'time': ('Time_taken(min)', TIME_DIMENSIONS, 'log', QUANTILE_ACCURACY),
+    'latitude': ('Delivery_location_latitude', LOCATION_DIMENSIONS, 'linear', LOCATION_RESOLUTION),
+    'longitude': ('Delivery_location_longitude', LOCATION_DIMENSIONS, 'linear', LOCATION_RESOLUTION),
+}
+
+# Faixa dos zeros e negativos nas faixas 'log'
+_ZERO_BIN = np.iinfo(np.int32).min
+
+# -----------------------------------
+# Funções
+# -----------------------------------
+def value_bins(valores, kind, param):
+    """ Faixa de cada valor. """
+    valores = np.asarray(valores, dtype=np.float64)
+
+    if kind == 'log':
+        gamma = (1 + param) / (1 - param)
+        positivos = valores > 0
+        faixas = np.ceil(np.log(np.where(positivos, valores, 1)) / np.log(gamma))
+        return np.where(positivos, faixas, _ZERO_BIN).astype(np.int32)
+
+    if kind == 'linear':
+        return np.floor(valores / param).astype(np.int32)
+
+    raise ValueError(f'tipo de faixa desconhecido: {kind}')
+
+def bin_values(faixas, kind, param):
+    """ Valor que representa cada faixa (o de menor erro dentro dela). """
+    faixas = np.asarray(faixas, dtype=np.float64)
+
+    if kind == 'log':
+        gamma = (1 + param) / (1 - param)
+        return np.where(faixas == _ZERO_BIN, 0.0, 2 * gamma ** faixas / (gamma + 1))
+
+    return (faixas + 0.5) * param
+
+def build_quantiles(df1, column, keys, kind, param):
+    """ Esboço de quantis de `column` por célula de `keys`.
+
+    Output: dict com `cells` (Dataframe indexado por `keys` + `bin` com a
+            coluna `count`), `kind` e `param`
+    """
+    presente = df1[column].notna().to_numpy()
+    celulas = pd.DataFrame({chave: df1[chave].to_numpy()[presente] for chave in keys})
+    celulas['bin'] = value_bins(df1[column].to_numpy(dtype=np.float64)[presente], kind, param)
+    celulas['count'] = np.ones(len(celulas), dtype=np.int64)
+
+    return {'cells': celulas.groupby(keys + ['bin']).sum(), 'kind': kind, 'param': param}
+
+def build_sketch(df1, name):
+    """ Esboço `name` de `SKETCHES`. """
+    column, keys, kind, param = SKETCHES[name]
+
+    return build_quantiles(df1, column, keys, kind, param)
+
+def merge_quantiles(*partes):
+    """ Junta esboços de pedaços diferentes somando as contagens. """
+    partes = [parte for parte in partes if parte is not None]
+
+    return dict(partes[0], cells=merge_cells(*(parte['cells'] for parte in partes)))
+
+def add_quantiles(esboco, lote):
+    """ Soma o esboço de um lote ao existente (ver `aggregates.add_cells`). """
+    return dict(esboco, cells=add_cells(esboco['cells'], lote['cells']))
+
+def filter_quantiles(esboco, date_cutoff=None, traffic_options=None, cities=None):
+    """ Os filtros da barra lateral aplicados às células do esboço. """
+    return dict(esboco, cells=filter_cells(esboco['cells'], date_cutoff, traffic_options, cities))
+
+def quantiles_by(esboco, by, qs=(0.5, 0.9, 0.99)):
+    """ Quantis por `by` a partir das faixas.
+
+    Input: esboço, dimensões e quantis (entre 0 e 1)
+    Output: Dataframe indexado por `by` com uma coluna por quantil
+            (`p50`, `p90`, ...)
+    """
+    contagem = esboco['cells']['count'].groupby(level=by + ['bin']).sum()
+    contagem = contagem[contagem > 0]
+    acumulado = contagem.groupby(level=by).cumsum()
+    total = contagem.groupby(level=by).transform('sum')
+
+    colunas = {}
+    for q in qs:
+        # Primeira faixa em que o acumulado passa da posição do quantil
+        alcancou = (acumulado > q * (total - 1)).to_numpy()
+        primeira = contagem[alcancou].groupby(level=by).head(1)
+        valores = bin_values(primeira.index.get_level_values('bin'), esboco['kind'], esboco['param'])
+        colunas[f'p{q * 100:g}'] = pd.Series(valores, index=primeira.index.droplevel('bin'))
+
+    return pd.DataFrame(colunas)
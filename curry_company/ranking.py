@@ -0,0 +1,116 @@
+""" Rankings top-k por grupo (entregadores mais rápidos e mais lentos).
+
+Em vez de ordenar todos os entregadores, cada grupo (cidade) passa por um
+único `np.argpartition` com dois pivôs, que separa ao mesmo tempo os k
+menores e os k maiores valores em tempo linear; só esses 2k são
+ordenados no final. O custo fica O(n) no número de entregadores, e os
+dois rankings saem da mesma passada.
+"""
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import numpy as np
+import pandas as pd
+
+# Métrica por entregador: nome -> função de agregação do groupby
+METRICS = {
+    'max': lambda grupos: grupos.max(),
+    'mean': lambda grupos: grupos.mean(),
+    'p90': lambda grupos: grupos.quantile(0.9),
+}
+
+# -----------------------------------
+# Funções
+# -----------------------------------
+def group_metric(df1, by='City', key='Delivery_person_ID', value='Time_taken(min)', metric='max'):
+    """ Métrica de `value` por (`by`, `key`).
+
+    Input:
+        - metric: 'max', 'mean' ou 'p90' (ver `METRICS`)
+    Output: Series indexada por (`by`, `key`), sem ordem definida (o
+            `top_k_per_group` desempata pelo `key`)
+    """
+    grupos = df1.loc[:, [by, key, value]].groupby([by, key], observed=True)[value]
+
+    return METRICS[metric](grupos)
+
+def _take_ties(dentro, iguais, ties, k):
+    """ Completa `dentro` até k posições com as de menor `ties` entre as
+    empatadas no limite, sem ordenar os empates.
+    """
+    falta = k - len(dentro)
+    if len(iguais) > falta:
+        iguais = iguais[np.argpartition(ties[iguais], falta - 1)[:falta]]
+
+    return np.concatenate([dentro, iguais])
+
+def top_k_positions(valores, k, ties=None):
+    """ Posições dos k menores valores, em ordem crescente, e dos k maiores,
+    em ordem decrescente. Empates, inclusive no k-ésimo valor, ficam com o
+    menor `ties` (padrão: a menor posição).
+    """
+    n = len(valores)
+    if ties is None:
+        ties = np.arange(n)
+    if n <= 2 * k:
+        return np.lexsort((ties, valores))[:k], np.lexsort((ties, -valores))[:k]
+
+    # Dois pivôs: tudo antes de k-1 é <= e tudo depois de n-k é >=
+    particao = np.argpartition(valores, [k - 1, n - k])
+    menor_limite, maior_limite = valores[particao[k - 1]], valores[particao[n - k]]
+
+    # O argpartition escolhe qualquer um dos empatados no limite; aqui
+    # entram os de menor `ties`
+    menores = _take_ties(np.flatnonzero(valores < menor_limite), np.flatnonzero(valores == menor_limite), ties, k)
+    maiores = _take_ties(np.flatnonzero(valores > maior_limite), np.flatnonzero(valores == maior_limite), ties, k)
+
+    # Só os 2k escolhidos são ordenados: pelo valor e, nos empates, por `ties`
+    menores = menores[np.lexsort((ties[menores], valores[menores]))]
+    maiores = maiores[np.lexsort((ties[maiores], -valores[maiores]))]
+
+    return menores, maiores
+
+def top_k_per_group(serie, k=10, groups=None):
+    """ Os k menores e os k maiores valores de cada grupo.
+
+    Input:
+        - serie: Series indexada por (grupo, item), como a saída de
+          `group_metric`
+        - k: quantos itens por grupo
+        - groups: grupos a considerar, na ordem de saída (padrão: todos)
+    Output: (menores, maiores), dois Dataframes com as colunas do índice e
+            a coluna de valores, k linhas por grupo; empates ficam na
+            ordem do item
+    """
+    codigos, nomes = pd.factorize(serie.index.get_level_values(0), sort=True)
+    valores = serie.to_numpy(dtype=float)
+
+    # Ordem de cada item para os empates: o código no nível do índice, se
+    # o nível está em ordem (categorias em ordem alfabética, ver `schema`)
+    itens = serie.index.levels[1]
+    ordem_itens = serie.index.codes[1]
+    if not itens.is_monotonic_increasing:
+        ordem_itens = np.argsort(np.argsort(itens))[ordem_itens]
+
+    # Separa as linhas por grupo ordenando só os códigos dos grupos (poucos
+    # valores distintos: o numpy usa radix sort para inteiros pequenos)
+    if len(nomes) < np.iinfo(np.int16).max:
+        codigos = codigos.astype(np.int16)
+    ordem = np.argsort(codigos, kind='stable')
+    limites = np.searchsorted(codigos[ordem], np.arange(len(nomes) + 1))
+    fatias = {nome: ordem[limites[i]:limites[i + 1]] for i, nome in enumerate(nomes)}
+
+    posicoes_menores, posicoes_maiores = [], []
+    for grupo in (fatias if groups is None else groups):
+        if grupo not in fatias:
+            continue
+        posicoes = fatias[grupo]
+        menores, maiores = top_k_positions(valores[posicoes], k, ordem_itens[posicoes])
+        posicoes_menores.append(posicoes[menores])
+        posicoes_maiores.append(posicoes[maiores])
+
+    def montar(posicoes):
+        posicoes = np.concatenate(posicoes) if posicoes else np.array([], dtype=int)
+        return serie.iloc[posicoes].reset_index()
+
+    return montar(posicoes_menores), montar(posicoes_maiores)
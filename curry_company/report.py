@@ -0,0 +1,237 @@
+""" Relatório em lote das métricas do dashboard, sem Streamlit.
+
+Uso:
+    python -m curry_company.report --date 2022-04-06
+    python -m curry_company.report --by city --workers 3
+    python -m curry_company.report --by date --dates 2022-03-01 2022-03-15 2022-04-06
+
+Calcula todas as seções de todas as abas das três páginas (as mesmas
+funções `metrics.*_tasks` que as páginas desenham) para uma data de corte e
+um conjunto de condições de trânsito, e grava em `--out/<relatório>/` um
+`report.json` com os números e tabelas e um `report.html` estático com os
+gráficos. Com `--by city` ou `--by date` gera um relatório por cidade ou
+por data de corte, cada um em um processo: o dataset é carregado uma vez
+antes do fork e os processos filhos o herdam já tratado.
+"""
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import argparse
+import html
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from curry_company.data import DATA_PATH
+from curry_company.executor import evaluate
+from curry_company.metrics import PAGE_TABS, PAGE_TASKS, available_cities, filtered_view, load_backend
+from curry_company.scaffold import DATE_CUTOFF, TRAFFIC_OPTIONS
+
+OUT_DIR = 'reports'
+
+# Seções que só fazem sentido no HTML (o mapa já vem renderizado)
+HTML_ONLY = {'country_map'}
+
+# -----------------------------------
+# Serialização
+# -----------------------------------
+def to_jsonable(valor):
+    """ Converte um resultado de seção em tipos do json: tabelas viram
+    listas de registros, gráficos do plotly viram o json da figura.
+    """
+    if isinstance(valor, pd.DataFrame):
+        tabela = valor if isinstance(valor.index, pd.RangeIndex) else valor.reset_index()
+        return json.loads(tabela.to_json(orient='records', date_format='iso'))
+
+    if isinstance(valor, pd.Series):
+        # Métricas de uma linha só (como as de `avg_std_time_delivery`)
+        if valor.index.equals(pd.RangeIndex(1)):
+            return to_jsonable(valor.iloc[0])
+        return json.loads(valor.to_json(orient='index', date_format='iso'))
+
+    if isinstance(valor, dict):
+        return {str(chave): to_jsonable(item) for chave, item in valor.items()}
+
+    if isinstance(valor, (tuple, list)):
+        return [to_jsonable(item) for item in valor]
+
+    if isinstance(valor, np.generic):
+        return valor.item()
+
+    if isinstance(valor, (pd.Timestamp, datetime)):
+        return valor.isoformat()
+
+    if hasattr(valor, 'to_plotly_json'):
+        return json.loads(valor.to_json())
+
+    return valor
+
+def report_json(relatorio):
+    """ O relatório sem as seções só de HTML, pronto para `json.dump`. """
+    paginas = {
+        pagina: {
+            aba: {nome: to_jsonable(valor) for nome, valor in secoes.items() if nome not in HTML_ONLY}
+            for aba, secoes in abas.items()
+        }
+        for pagina, abas in relatorio['pages'].items()
+    }
+
+    return dict(relatorio, pages=paginas)
+
+def _html_section(nome, valor, plotly_js):
+    """ HTML de uma seção. `plotly_js` é uma lista de um item que marca se
+    o plotly.js já foi incluído na página.
+    """
+    if isinstance(valor, pd.DataFrame):
+        return valor.to_html(classes='tabela', border=0)
+
+    if isinstance(valor, pd.Series):
+        if valor.index.equals(pd.RangeIndex(1)):
+            return _html_section(nome, valor.iloc[0], plotly_js)
+        return valor.to_frame().to_html(classes='tabela', border=0)
+
+    if isinstance(valor, dict):
+        return ''.join(f'<h4>{html.escape(str(chave))}</h4>' + _html_section(chave, item, plotly_js)
+                       for chave, item in valor.items())
+
+    if isinstance(valor, (tuple, list)):
+        return ''.join(_html_section(nome, item, plotly_js) for item in valor)
+
+    if hasattr(valor, 'to_plotly_json'):
+        incluir = 'cdn' if not plotly_js[0] else False
+        plotly_js[0] = True
+        return valor.to_html(full_html=False, include_plotlyjs=incluir)
+
+    if isinstance(valor, str) and nome in HTML_ONLY:
+        return f'<iframe srcdoc="{html.escape(valor)}" width="1024" height="610"></iframe>'
+
+    return f'<p class="metrica">{html.escape(str(to_jsonable(valor)))}</p>'
+
+def render_html(relatorio):
+    """ Página HTML estática com todas as seções do relatório. """
+    plotly_js = [False]
+    filtros = relatorio['filters']
+    partes = [
+        '<!DOCTYPE html><html><head><meta charset="utf-8">',
+        f'<title>Curry Company - {html.escape(relatorio["name"])}</title>',
+        '<style>body{font-family:sans-serif;margin:2em} .tabela{border-collapse:collapse}'
+        ' .tabela td,.tabela th{padding:2px 8px;border-bottom:1px solid #ddd} .metrica{font-size:1.5em}</style>',
+        '</head><body>',
+        '<h1>Curry Company</h1>',
+        f'<p>Data limite: {html.escape(filtros["date_cutoff"])} &middot; '
+        f'Trânsito: {html.escape(", ".join(filtros["traffic_options"]))} &middot; '
+        f'Cidades: {html.escape(", ".join(filtros["cities"] or ["todas"]))} &middot; '
+        f'Gerado em {html.escape(relatorio["generated_at"])}</p>',
+    ]
+    for pagina, abas in relatorio['pages'].items():
+        partes.append(f'<h2>Visão {html.escape(pagina.capitalize())}</h2>')
+        for aba, secoes in abas.items():
+            partes.append(f'<h3>{html.escape(aba)}</h3>')
+            for nome, valor in secoes.items():
+                partes.append(f'<h4>{html.escape(nome)}</h4>')
+                partes.append(_html_section(nome, valor, plotly_js))
+    partes.append('</body></html>')
+
+    return '\n'.join(partes)
+
+# -----------------------------------
+# Relatórios
+# -----------------------------------
+def report_name(date_cutoff, cities=None):
+    nome = pd.Timestamp(date_cutoff).strftime('%Y-%m-%d')
+    if cities:
+        nome += '_' + '-'.join(cidade.replace(' ', '') for cidade in cities)
+
+    return nome
+
+def build_report(date_cutoff, traffic_options, cities=None, path=DATA_PATH):
+    """ Calcula todas as abas de todas as páginas com os mesmos filtros.
+
+    Output: dict com os filtros e `pages`: página -> aba -> seção -> resultado
+    """
+    view = filtered_view(date_cutoff, traffic_options, cities, path)
+
+    paginas = {}
+    for pagina, abas in PAGE_TABS.items():
+        paginas[pagina] = {}
+        for aba in abas:
+            tarefas = PAGE_TASKS[pagina](aba, view)
+            if tarefas:
+                paginas[pagina][aba] = evaluate(tarefas)
+
+    return {
+        'name': report_name(date_cutoff, cities),
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'dataset_version': list(view.key[0]),
+        'filters': {
+            'date_cutoff': view.date_cutoff.strftime('%Y-%m-%d'),
+            'traffic_options': view.traffic_options,
+            'cities': view.cities,
+        },
+        'pages': paginas,
+    }
+
+def run_job(date_cutoff, traffic_options, cities=None, path=DATA_PATH, out_dir=OUT_DIR):
+    """ Gera e grava um relatório. Output: pasta do relatório e segundos gastos. """
+    inicio = time.perf_counter()
+    relatorio = build_report(date_cutoff, traffic_options, cities, path)
+
+    pasta = os.path.join(out_dir, relatorio['name'])
+    os.makedirs(pasta, exist_ok=True)
+    with open(os.path.join(pasta, 'report.json'), 'w', encoding='utf-8') as arquivo:
+        json.dump(report_json(relatorio), arquivo, ensure_ascii=False, indent=1, default=str)
+    with open(os.path.join(pasta, 'report.html'), 'w', encoding='utf-8') as arquivo:
+        arquivo.write(render_html(relatorio))
+
+    return pasta, time.perf_counter() - inicio
+
+def report_jobs(args):
+    """ Argumentos de `run_job` de cada relatório pedido na linha de comando. """
+    if args.by == 'city':
+        return [(args.date, args.traffic, [cidade]) for cidade in available_cities(args.path)]
+
+    if args.by == 'date':
+        return [(data, args.traffic, None) for data in args.dates]
+
+    return [(args.date, args.traffic, None)]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Relatório em lote das métricas do dashboard')
+    parser.add_argument('--path', default=DATA_PATH, help='csv do dataset')
+    parser.add_argument('--date', default=DATE_CUTOFF, help='data limite (AAAA-MM-DD)')
+    parser.add_argument('--traffic', nargs='+', default=TRAFFIC_OPTIONS, choices=TRAFFIC_OPTIONS)
+    parser.add_argument('--by', choices=['none', 'city', 'date'], default='none',
+                        help='um relatório por cidade ou por data de --dates')
+    parser.add_argument('--dates', nargs='+', default=[], help='datas limite para --by date')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='processos em paralelo para --by city/date')
+    parser.add_argument('--out', default=OUT_DIR, help='pasta dos relatórios')
+    args = parser.parse_args(argv)
+
+    if args.by == 'date' and not args.dates:
+        parser.error('--by date precisa de --dates')
+
+    # Carrega e trata o dataset antes do fork: os processos herdam o cache
+    load_backend(args.path)
+
+    jobs = report_jobs(args)
+    if args.workers <= 1 or len(jobs) <= 1:
+        resultados = [run_job(*job, path=args.path, out_dir=args.out) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(args.workers, len(jobs))) as pool:
+            futuros = [pool.submit(run_job, *job, path=args.path, out_dir=args.out) for job in jobs]
+            resultados = [futuro.result() for futuro in futuros]
+
+    for pasta, segundos in resultados:
+        print(f'{pasta}: {segundos:.1f} s')
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+""" Estrutura comum das páginas: configuração, barra lateral e imports sob demanda.
+
+Cada página só chama `start_page` e `sidebar_filters`; o logo é lido do
+disco uma vez por processo (e não a cada rerun) e vai para o Streamlit
+como bytes, sem passar pelo PIL. A seleção dos filtros fica na sessão e
+acompanha o usuário de uma página para a outra.
+
+`lazy_module` adia o import de bibliotecas pesadas (plotly, folium) até o
+primeiro uso de um atributo: uma página que não desenha mapa nunca
+importa o folium, e o relatório e a API não importam o Streamlit.
+"""
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import importlib
+from datetime import datetime
+from functools import lru_cache
+
+LOGO_PATH = 'alvo-de-dardos.png'
+
+# Filtros da barra lateral
+TRAFFIC_OPTIONS = ['Low', 'Medium', 'High', 'Jam']
+DATE_CUTOFF = datetime(2022, 4, 13)
+DATE_MIN = datetime(2022, 2, 11)
+DATE_MAX = datetime(2022, 4, 6)
+
+# Seleção dos filtros na sessão. Fica fora das chaves dos widgets porque o
+# Streamlit apaga o estado de um widget quando a página que o desenha sai
+# da tela; cada página semeia as chaves dos widgets a partir daqui.
+FILTER_STATE = 'sidebar_filters'
+DATE_KEY = 'filtro_data'
+TRAFFIC_KEY = 'filtro_transito'
+
+# -----------------------------------
+# Imports sob demanda
+# -----------------------------------
+class LazyModule:
+    """ Módulo importado no primeiro acesso a um atributo.
+
+    O `importlib.import_module` já é protegido pelo lock de import do
+    Python, então threads do pool de `executor` podem disparar o import ao
+    mesmo tempo.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, atributo):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+
+        return getattr(self._module, atributo)
+
+    def __repr__(self):
+        estado = 'carregado' if self._module is not None else 'não carregado'
+        return f'<módulo sob demanda {self._name!r} ({estado})>'
+
+def lazy_module(name):
+    return LazyModule(name)
+
+st = lazy_module('streamlit')
+
+# -----------------------------------
+# Página
+# -----------------------------------
+@lru_cache(maxsize=None)
+def logo(path=LOGO_PATH):
+    """ Bytes do logo, lidos uma vez por processo. """
+    with open(path, 'rb') as arquivo:
+        return arquivo.read()
+
+def start_page(title, icon, layout='wide'):
+    """ Configuração da página e início da medição do rerun. """
+    from curry_company.profiling import start_run
+
+    st.set_page_config(page_title=title, page_icon=icon, layout=layout)
+    start_run(title)
+
+def sidebar_header():
+    st.sidebar.image(logo(), width=120)
+
+    st.sidebar.markdown('# Cury  Company')
+    st.sidebar.markdown('## Fastest Delivery in Town')
+    st.sidebar.markdown('''---''')
+
+def sidebar_filters():
+    """ Barra lateral das páginas de visão: logo, data limite e trânsito,
+    começando da última seleção feita na sessão, em qualquer página.
+
+    Output: (data limite, condições de trânsito selecionadas)
+    """
+    filtros = st.session_state.get(FILTER_STATE) or {'date_cutoff': DATE_CUTOFF,
+                                                      'traffic_options': TRAFFIC_OPTIONS}
+
+    # O estado dos widgets é a própria chave deles, semeada só quando a
+    # página abre; sem `value`/`default` o widget não é recriado e a
+    # seleção não causa um segundo rerun
+    iniciais = {DATE_KEY: filtros['date_cutoff'], TRAFFIC_KEY: filtros['traffic_options']}
+    for chave, valor in iniciais.items():
+        if chave not in st.session_state:
+            st.session_state[chave] = valor
+
+    # Fora do `streamlit run` a sessão não guarda nada: os valores iniciais
+    # vão direto para os widgets
+    semeado = all(chave in st.session_state for chave in iniciais)
+
+    sidebar_header()
+
+    st.sidebar.markdown('## Selecione uma data limite')
+
+    date_slider = st.sidebar.slider(
+        'Até qual valor?',
+        min_value=DATE_MIN,
+        max_value=DATE_MAX,
+        format='YYYY-MM-DD',
+        key=DATE_KEY,
+        **({} if semeado else {'value': iniciais[DATE_KEY]})
+    )
+
+    st.sidebar.markdown('''---''')
+
+    traffic_options = st.sidebar.multiselect(
+        'Quais as condições do trânsito',
+        TRAFFIC_OPTIONS,
+        key=TRAFFIC_KEY,
+        **({} if semeado else {'default': iniciais[TRAFFIC_KEY]})
+    )
+
+    st.sidebar.markdown('''---''')
+    st.sidebar.markdown('### Powered by Comunidade DS')
+
+    st.session_state[FILTER_STATE] = {'date_cutoff': date_slider, 'traffic_options': traffic_options}
+
+    return date_slider, traffic_options
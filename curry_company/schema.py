@@ -0,0 +1,204 @@
+""" Tipos compactos do dataset limpo.
+
+Depois da limpeza quase todas as colunas de texto são objetos Python
+(dezenas de bytes por célula) e os números ficam em int64/float64. Aqui
+cada coluna ganha o menor tipo que cabe nos valores:
+
+- dimensões de poucos valores e o ID do entregador: categoricals (um
+  dicionário de valores + códigos int8/int16 por linha)
+- ID do pedido: o hexadecimal vira inteiro sem sinal
+- horários do pedido e da retirada: minutos desde a meia-noite (Int16,
+  com valor ausente onde o csv tem `NaN`)
+- idade, condição do veículo, entregas múltiplas e tempo: int8/int16
+- avaliação e coordenadas: float32
+
+Os tipos numéricos de `NUMERIC_TYPES` são os preferidos: se os valores
+observados não cabem neles (um ID acima de 2**32, por exemplo), a coluna
+fica com o menor tipo mais largo que cabe (ver `fitting_type`).
+
+Relatório de bytes por linha antes e depois:
+    python -m curry_company.schema [caminho_do_csv]
+"""
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Muda quando os tipos, as colunas gravadas ou a ordem das linhas mudam,
+# para que snapshots e bancos antigos sejam refeitos
+SCHEMA_VERSION = 3
+
+CATEGORY_COLUMNS = ['Delivery_person_ID', 'Weatherconditions', 'Road_traffic_density',
+                    'Type_of_order', 'Type_of_vehicle', 'Festival', 'City']
+
+CLOCK_COLUMNS = ['Time_Orderd', 'Time_Order_picked']
+
+# Tipo preferido de cada coluna numérica (ver `fitting_type`)
+NUMERIC_TYPES = {
+    'ID': np.uint32,
+    'Delivery_person_Age': np.int8,
+    'Delivery_person_Ratings': np.float32,
+    'Restaurant_latitude': np.float32,
+    'Restaurant_longitude': np.float32,
+    'Delivery_location_latitude': np.float32,
+    'Delivery_location_longitude': np.float32,
+    'Vehicle_condition': np.int8,
+    'multiple_deliveries': np.int8,
+    'Time_taken(min)': np.int16,
+}
+
+# -----------------------------------
+# Funções
+# -----------------------------------
+# Código ASCII -> valor do dígito hexadecimal (-1 para o que não é dígito)
+_HEX_DIGITS = np.full(128, -1, dtype=np.int64)
+for _valor, _digito in enumerate('0123456789abcdef'):
+    _HEX_DIGITS[ord(_digito)] = _HEX_DIGITS[ord(_digito.upper())] = _valor
+
+def hex_to_int(valores):
+    """ '0x4607' -> 17927, sem chamar `int` valor a valor.
+
+    Os textos viram um array unicode de largura fixa (um código por
+    caractere, completado com zeros à direita) e os dígitos são somados
+    coluna a coluna, como o `int(x, 16)`: o prefixo `0x` é opcional e
+    qualquer outro caractere é erro.
+    """
+    texto = np.asarray(valores, dtype=str)
+    codigos = texto.view(np.uint32).reshape(len(texto), -1) if texto.size else np.zeros((0, 1), np.uint32)
+    digitos = _HEX_DIGITS[np.minimum(codigos, 127)]
+    digitos[codigos > 127] = -1
+
+    # O prefixo e o preenchimento à direita não contam como dígitos
+    fora = codigos == 0
+    if codigos.shape[1] >= 2:
+        prefixo = (codigos[:, 0] == ord('0')) & np.isin(codigos[:, 1], [ord('x'), ord('X')])
+        fora[prefixo, :2] = True
+    if ((digitos < 0) & ~fora).any() or (fora.all(axis=1)).any():
+        raise ValueError('ID com caracteres que não são hexadecimais')
+
+    resultado = np.zeros(len(texto), dtype=np.uint64)
+    for coluna in range(codigos.shape[1]):
+        dentro = ~fora[:, coluna]
+        resultado[dentro] = resultado[dentro] * 16 + digitos[dentro, coluna].astype(np.uint64)
+
+    return pd.Series(resultado, index=getattr(valores, 'index', None))
+
+def clock_minutes(valores):
+    """ 'HH:MM:SS' -> minutos desde a meia-noite; o que não for horário vira <NA>. """
+    horario = valores.str.extract(r'^(\d{2}):(\d{2})', expand=True)
+    minutos = pd.to_numeric(horario[0]) * 60 + pd.to_numeric(horario[1])
+
+    return minutos.astype('Int16')
+
+def fitting_type(valores, tipo):
+    """ `tipo` se o mínimo e o máximo dos valores cabem nele; senão o menor
+    tipo mais largo que cabe (com sinal, se houver negativos). Inteiros que
+    não cabem em nenhum tipo inteiro são erro.
+    """
+    tipo = np.dtype(tipo)
+    minimo, maximo = valores.min(), valores.max()
+    if pd.isna(minimo):
+        return tipo
+
+    if tipo.kind == 'f':
+        return tipo if max(abs(minimo), abs(maximo)) <= np.finfo(tipo).max else np.dtype(np.float64)
+
+    sinal = 'u' if tipo.kind == 'u' and minimo >= 0 else 'i'
+    for tamanho in (1, 2, 4, 8):
+        largo = np.dtype(f'{sinal}{tamanho}')
+        limites = np.iinfo(largo)
+        if tamanho >= tipo.itemsize and limites.min <= minimo and maximo <= limites.max:
+            return largo
+
+    raise ValueError(f'{valores.name}: valores de {minimo} a {maximo} não cabem num tipo inteiro')
+
+def compact_types(df1):
+    """ Converte as colunas do dataframe limpo para os tipos compactos.
+
+    Pode ser chamada de novo sobre um dataframe já compacto (por exemplo
+    depois de um `pd.concat`, que transforma em texto os categoricals com
+    dicionários diferentes); o que já está no tipo certo não é convertido.
+    """
+    # import local: o cleaning importa este módulo
+    from curry_company.cleaning import map_unique
+
+    # IDs são únicos: sem `map_unique`, a conversão já é vetorizada
+    if df1['ID'].dtype == object:
+        df1['ID'] = hex_to_int(df1['ID']).to_numpy()
+    for coluna in CLOCK_COLUMNS:
+        if df1[coluna].dtype == object:
+            df1[coluna] = pd.array(map_unique(df1[coluna], clock_minutes), dtype='Int16')
+
+    # Só atribui o que muda de tipo: a atribuição copia a coluna, e as
+    # colunas do snapshot apontam para o arquivo mapeado
+    for coluna, tipo in NUMERIC_TYPES.items():
+        if df1[coluna].dtype != tipo:
+            tipo = fitting_type(df1[coluna], tipo)
+            if df1[coluna].dtype != tipo:
+                df1[coluna] = df1[coluna].astype(tipo)
+    for coluna in CATEGORY_COLUMNS:
+        if df1[coluna].dtype != 'category':
+            df1[coluna] = df1[coluna].astype('category')
+
+        # Categorias em ordem alfabética, para que agrupamentos saiam na
+        # mesma ordem de antes (dicionários unidos do arrow vêm na ordem
+        # em que os valores aparecem)
+        categorias = df1[coluna].cat.categories
+        if not categorias.is_monotonic_increasing:
+            df1[coluna] = df1[coluna].cat.reorder_categories(categorias.sort_values())
+
+    return df1
+
+def union_categories(df1, batch):
+    """ Deixa os categoricals do dataframe e do lote com as mesmas categorias,
+    para que `pd.concat` mantenha os códigos em vez de voltar para texto.
+
+    Sem valores novos no lote, só o lote é recodificado; com valores novos,
+    as categorias viram a união (em ordem alfabética, como em
+    `compact_types`) e as colunas do dataframe só trocam os códigos. O lote
+    recebe o mesmo objeto de dtype do dataframe: o `pd.concat` compara os
+    dtypes pelo hash das categorias, que fica guardado no objeto.
+
+    Output: (dataframe, lote)
+    """
+    df1, batch = df1.copy(deep=False), batch.copy(deep=False)
+    for coluna in CATEGORY_COLUMNS:
+        categorias = df1[coluna].cat.categories
+        novas = batch[coluna].cat.categories
+        if (categorias.get_indexer(novas) < 0).any():
+            df1[coluna] = df1[coluna].cat.set_categories(categorias.union(novas))
+        batch[coluna] = batch[coluna].astype(df1[coluna].dtype)
+
+    return df1, batch
+
+def bytes_per_row(df1):
+    """ Bytes por linha de cada coluna (contando os objetos Python). """
+    return df1.memory_usage(deep=True, index=False) / max(len(df1), 1)
+
+def memory_report(antes, depois):
+    """ Tabela com tipo e bytes por linha de cada coluna, antes e depois. """
+    relatorio = pd.DataFrame({
+        'tipo_antes': antes.dtypes.astype(str),
+        'bytes_antes': bytes_per_row(antes),
+        'tipo_depois': depois.dtypes.astype(str),
+        'bytes_depois': bytes_per_row(depois),
+    })
+    relatorio.loc['total'] = ['', relatorio['bytes_antes'].sum(), '', relatorio['bytes_depois'].sum()]
+
+    return relatorio
+
+if __name__ == '__main__':
+    from curry_company.cleaning import clean_code
+    from curry_company.data import DATA_PATH
+
+    df_raw = pd.read_csv(sys.argv[1] if len(sys.argv) > 1 else DATA_PATH)
+    antes = clean_code(df_raw, compact=False)
+    depois = compact_types(antes.copy())
+
+    relatorio = memory_report(antes, depois)
+    print(relatorio.round(1).to_string())
+    print(f"\n{len(depois)} linhas: {relatorio.loc['total', 'bytes_antes']:.1f} -> "
+          f"{relatorio.loc['total', 'bytes_depois']:.1f} bytes por linha")
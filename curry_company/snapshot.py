@@ -0,0 +1,241 @@
+""" Snapshot colunar (Arrow IPC / Feather v2) do dataset já limpo.
+
+Uso:
+    python -m curry_company.snapshot [caminho_do_csv]
+
+O snapshot é gravado sem compressão ao lado do csv (`train.csv` ->
+`train.feather`) para que possa ser aberto com memory-map: as colunas
+numéricas e de data são lidas direto das páginas do arquivo, sem parse de
+texto. Ele já vem ordenado por `Order_Date` e com as colunas derivadas de
+`data.add_derived_columns` (a distância), então o carregamento não
+reordena, não copia e não recalcula nada. Nos metadados do schema ficam o mtime, o tamanho e o sha256 do csv
+de origem, usados para saber quando o snapshot ficou velho, e a versão
+dos tipos compactos (`schema.SCHEMA_VERSION`).
+
+Lotes anexados depois (ver `curry_company.ingest`) viram segmentos
+`train.append-000001.feather`, ... lidos em sequência após o snapshot
+base, cada um ordenado e com as mesmas colunas; os metadados do último
+segmento descrevem o csv já com o lote. Um processo que já tem o dataset
+em memória lê só os segmentos novos (ver `read_new_segments` e
+`data.load_data`), inclusive os gravados por outro processo.
+"""
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import glob
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from curry_company.cleaning import clean_code
+from curry_company.schema import SCHEMA_VERSION, compact_types
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+METADATA_KEY = b'curry_company.source'
+
+# -----------------------------------
+# Funções
+# -----------------------------------
+def snapshot_path(path):
+    """ Caminho do snapshot de um csv: mesmo nome, extensão `.feather`. """
+    return os.path.splitext(path)[0] + '.feather'
+
+def segment_path(path, numero):
+    """ Caminho do n-ésimo segmento anexado ao snapshot. """
+    return os.path.splitext(path)[0] + f'.append-{numero:06d}.feather'
+
+def segment_paths(path):
+    """ Segmentos anexados ao snapshot, em ordem. """
+    return sorted(glob.glob(glob.escape(os.path.splitext(path)[0]) + '.append-*.feather'))
+
+def file_sha256(path):
+    """ sha256 do arquivo, lido em blocos de 1 MB. """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1 << 20), b''):
+            digest.update(bloco)
+
+    return digest.hexdigest()
+
+def source_metadata(path):
+    """ Identidade do csv gravada junto com o snapshot. """
+    info = os.stat(path)
+    return {'mtime_ns': info.st_mtime_ns, 'size': info.st_size, 'sha256': file_sha256(path)}
+
+def write_table(df1, destino, source):
+    """ Grava o dataframe limpo como Arrow IPC sem compressão.
+
+    A escrita vai para um arquivo temporário e só então substitui o
+    destino, para que um leitor nunca encontre um arquivo pela metade.
+    """
+    table = pa.Table.from_pandas(df1, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[METADATA_KEY] = json.dumps(dict(source, schema=SCHEMA_VERSION)).encode()
+    table = table.replace_schema_metadata(metadata)
+
+    temporario = destino + '.tmp'
+    with pa.OSFile(temporario, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(temporario, destino)
+
+def write_snapshot(df1, path, source):
+    """ Grava o snapshot base e descarta os segmentos anteriores. """
+    write_table(df1, snapshot_path(path), source)
+    for segmento in segment_paths(path):
+        os.remove(segmento)
+
+def append_segment(batch, path, source):
+    """ Anexa um lote já limpo ao snapshot como um novo segmento. """
+    write_table(batch, segment_path(path, len(segment_paths(path)) + 1), source)
+
+def unify_types(tables):
+    """ Deixa os pedaços com o mesmo schema do snapshot base.
+
+    Cada pedaço grava os categoricals com o menor índice que cabe no seu
+    dicionário (int8 no base, int16 num lote com mais entregadores...) e
+    os números com o tipo que cabe nos seus valores (ver
+    `schema.fitting_type`); usa o tipo mais largo de cada coluna.
+    """
+    campos = []
+    for i, campo in enumerate(tables[0].schema):
+        tipos = [table.schema.field(i).type for table in tables]
+        if pa.types.is_dictionary(campo.type):
+            campo = campo.with_type(max(tipos, key=lambda tipo: tipo.index_type.bit_width))
+        elif len(set(tipos)) > 1:
+            largo = np.result_type(*(tipo.to_pandas_dtype() for tipo in tipos))
+            campo = campo.with_type(pa.from_numpy_dtype(largo))
+        campos.append(campo)
+    schema = pa.schema(campos, metadata=tables[0].schema.metadata)
+
+    return [table.replace_schema_metadata(schema.metadata).cast(schema) for table in tables]
+
+def snapshot_version(path):
+    """ Identidade do arquivo do snapshot base (inode e mtime): muda quando
+    o snapshot é refeito, o que apaga os segmentos.
+    """
+    info = os.stat(snapshot_path(path))
+
+    return (info.st_ino, info.st_mtime_ns)
+
+def read_tables(arquivos):
+    """ Abre os arquivos com memory-map e junta as tabelas.
+
+    Output: (tabela arrow com tudo, metadados do csv do último arquivo)
+    """
+    tables = [pa.ipc.open_file(pa.memory_map(arquivo, 'r')).read_all() for arquivo in arquivos]
+    metadata = json.loads(tables[-1].schema.metadata[METADATA_KEY])
+
+    # concat_tables só junta os pedaços, sem copiar as colunas
+    return pa.concat_tables(unify_types(tables)), metadata
+
+def read_snapshot(path):
+    """ Abre o snapshot base e os segmentos com memory-map.
+
+    Output: (tabela arrow com tudo, metadados do csv de origem)
+    """
+    return read_tables([snapshot_path(path)] + segment_paths(path))
+
+def is_fresh(path, metadata):
+    """ O snapshot vale se o csv tem o mesmo mtime e tamanho; se o mtime
+    mudou, ainda vale quando o conteúdo (sha256) é o mesmo. Segmentos
+    anexados não guardam o sha256 (seria preciso reler o csv inteiro).
+    Snapshots gravados com outra versão dos tipos (`schema`) nunca valem.
+    """
+    if metadata.get('schema') != SCHEMA_VERSION:
+        return False
+
+    info = os.stat(path)
+    if info.st_size != metadata['size']:
+        return False
+    if info.st_mtime_ns == metadata['mtime_ns']:
+        return True
+
+    return metadata['sha256'] is not None and file_sha256(path) == metadata['sha256']
+
+def snapshot_is_fresh(path):
+    """ O snapshot existe e está em dia com o csv? """
+    if pa is None or not os.path.exists(snapshot_path(path)):
+        return False
+
+    return is_fresh(path, read_snapshot(path)[1])
+
+def build_snapshot(path):
+    """ Etapa de ingestão: lê e limpa o csv, ordena, calcula as colunas
+    derivadas e grava o snapshot.
+
+    Output: Dataframe tratado, com as colunas derivadas
+    """
+    # import local: o data importa este módulo
+    from curry_company.data import add_derived_columns
+
+    source = source_metadata(path)
+    df1 = add_derived_columns(clean_code(pd.read_csv(path)))
+    write_snapshot(df1, path, source)
+
+    return df1
+
+def load_dataset(path):
+    """ Carrega o dataset limpo pelo caminho mais barato disponível.
+
+    1. Snapshot existente e atualizado: memory-map, sem parse do csv.
+    2. Snapshot velho: refaz o snapshot a partir do csv.
+    3. Sem snapshot (ou sem pyarrow): lê e limpa o csv diretamente.
+
+    Output: (Dataframe, segmentos lidos), onde segmentos lidos é
+            (`snapshot_version`, quantidade de segmentos) ou None quando o
+            dataset não veio do snapshot
+    """
+    if pa is None or not os.path.exists(snapshot_path(path)):
+        return clean_code(pd.read_csv(path)), None
+
+    segmentos = segment_paths(path)
+    versao = snapshot_version(path)
+    table, metadata = read_tables([snapshot_path(path)] + segmentos)
+    if not is_fresh(path, metadata):
+        return build_snapshot(path), (snapshot_version(path), 0)
+
+    # split_blocks evita juntar as colunas em blocos 2D, o que copiaria os
+    # dados numéricos que hoje apontam para o arquivo mapeado. compact_types
+    # só reordena os dicionários unidos dos segmentos.
+    return compact_types(table.to_pandas(split_blocks=True)), (versao, len(segmentos))
+
+def read_dataset(path):
+    """ Dataset limpo (ver `load_dataset`). """
+    return load_dataset(path)[0]
+
+def read_new_segments(path, lidos):
+    """ Segmentos gravados depois dos `lidos` (ver `load_dataset`).
+
+    Só vale se o snapshot base é o mesmo e o último segmento está em dia
+    com o csv; senão o dataset precisa ser lido de novo.
+
+    Output: (lote com os segmentos novos, segmentos lidos) ou None
+    """
+    if pa is None or not os.path.exists(snapshot_path(path)) or snapshot_version(path) != lidos[0]:
+        return None
+
+    novos = segment_paths(path)[lidos[1]:]
+    if not novos:
+        return None
+
+    table, metadata = read_tables(novos)
+    if not is_fresh(path, metadata):
+        return None
+
+    return compact_types(table.to_pandas(split_blocks=True)), (lidos[0], lidos[1] + len(novos))
+
+if __name__ == '__main__':
+    from curry_company.data import DATA_PATH
+
+    caminho = sys.argv[1] if len(sys.argv) > 1 else DATA_PATH
+    df1 = build_snapshot(caminho)
+    print(f'{snapshot_path(caminho)}: {len(df1)} linhas')
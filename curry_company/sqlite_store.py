@@ -0,0 +1,411 @@
+""" Backend opcional em SQLite: filtros e agregações rodam no banco.
+
+Uso:
+    python -m curry_company.sqlite_store [caminho_do_csv]     # (re)cria o banco
+    CURRY_BACKEND=sqlite streamlit run Home.py
+
+O dataset limpo (com as colunas derivadas de `data.add_derived_columns`)
+vai para a tabela `orders` de um banco ao lado do csv (`train.csv` ->
+`train.sqlite`), com índices em `Order_Date`, `City`,
+`Road_traffic_density` e `Delivery_person_ID`. `Order_Date` é gravada
+como dias desde 1970-01-01, então o filtro de data é uma busca no índice.
+
+As consultas devolvem só resultados pequenos: as células do cubo e dos
+esboços (as mesmas de `aggregates.summarize`, `distinct` e `quantiles`,
+montadas com GROUP BY; as faixas de largura fixa das coordenadas também
+saem do banco), o perfil por entregador e o ranking de entregadores
+(GROUP BY por entregador e funções de janela), mínimos e máximos, a
+distância por cidade e as contagens da grade do mapa. Assim o processo não guarda o histórico inteiro em memória. Como o snapshot, o banco guarda a identidade do csv de origem e
+é refeito quando ela muda.
+"""
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import json
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import closing
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from curry_company.aggregates import MEASURES
+from curry_company.data import DATA_PATH, add_derived_columns
+from curry_company.distinct import build_distinct
+from curry_company.quantiles import SKETCHES, value_bins
+from curry_company.schema import CATEGORY_COLUMNS, CLOCK_COLUMNS, SCHEMA_VERSION, compact_types
+from curry_company.snapshot import is_fresh, read_dataset, source_metadata
+
+TABLE = 'orders'
+INDEXED_COLUMNS = ['Order_Date', 'City', 'Road_traffic_density', 'Delivery_person_ID']
+
+# Tipos das colunas de `data.add_derived_columns`, que o banco grava como REAL/INTEGER
+DERIVED_TYPES = {'distance': 'float32'}
+
+# Métricas do ranking (ver `ranking.METRICS`): agregações do sqlite ou
+# quantis, calculados com funções de janela
+SQL_METRICS = {'max': 'MAX', 'mean': 'AVG'}
+QUANTILE_METRICS = {'p90': 0.9}
+
+_EPOCH = pd.Timestamp('1970-01-01')
+
+_build_lock = threading.Lock()
+
+# Uma conexão somente leitura por thread (as do pool de `executor` também)
+_local = threading.local()
+
+# -----------------------------------
+# Banco
+# -----------------------------------
+def database_path(path):
+    """ Caminho do banco de um csv: mesmo nome, extensão `.sqlite`. """
+    return os.path.splitext(path)[0] + '.sqlite'
+
+def _quote(coluna):
+    return '"' + coluna.replace('"', '""') + '"'
+
+def epoch_days(datas):
+    """ Datas -> dias desde 1970-01-01 (como a coluna `Order_Date` do banco). """
+    return (pd.to_datetime(datas) - _EPOCH) // pd.Timedelta(days=1)
+
+def _from_days(df_aux):
+    if 'Order_Date' in df_aux.columns:
+        df_aux['Order_Date'] = _EPOCH + pd.to_timedelta(df_aux['Order_Date'], unit='D')
+
+    return df_aux
+
+def to_sql_frame(df1):
+    """ Dataframe tratado -> colunas que o sqlite3 sabe gravar. """
+    df_aux = df1.copy()
+    df_aux['Order_Date'] = epoch_days(df_aux['Order_Date'])
+    for coluna in CATEGORY_COLUMNS + CLOCK_COLUMNS:
+        df_aux[coluna] = df_aux[coluna].astype(object).where(df_aux[coluna].notna(), None)
+
+    return df_aux
+
+def build_database(path=DATA_PATH):
+    """ Etapa de ingestão: grava o dataset limpo no banco, com os índices.
+
+    A escrita vai para um arquivo temporário que depois substitui o banco,
+    então quem está lendo nunca vê um banco pela metade.
+    """
+    source = source_metadata(path)
+    df1 = add_derived_columns(read_dataset(path))
+
+    destino = database_path(path)
+    temporario = destino + '.tmp'
+    if os.path.exists(temporario):
+        os.remove(temporario)
+
+    with closing(sqlite3.connect(temporario)) as conexao:
+        to_sql_frame(df1).to_sql(TABLE, conexao, index=False, chunksize=50_000)
+        for coluna in INDEXED_COLUMNS:
+            conexao.execute(f'CREATE INDEX idx_{TABLE}_{coluna.lower()} ON {TABLE} ({_quote(coluna)})')
+        conexao.execute('CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)')
+        conexao.execute('INSERT INTO meta VALUES (?, ?)',
+                        ('source', json.dumps(dict(source, schema=SCHEMA_VERSION))))
+        conexao.execute('ANALYZE')
+        conexao.commit()
+    os.replace(temporario, destino)
+
+    return len(df1)
+
+def database_is_fresh(path=DATA_PATH):
+    """ O banco existe e está em dia com o csv (ver `snapshot.is_fresh`)? """
+    destino = database_path(path)
+    if not os.path.exists(destino):
+        return False
+
+    with closing(sqlite3.connect(f'file:{quote(destino)}?mode=ro', uri=True)) as conexao:
+        linha = conexao.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+
+    return linha is not None and is_fresh(path, json.loads(linha[0]))
+
+def ensure_database(path=DATA_PATH):
+    """ Cria ou refaz o banco se ele não estiver em dia. """
+    with _build_lock:
+        if not database_is_fresh(path):
+            build_database(path)
+
+    return database_path(path)
+
+def database_version(path=DATA_PATH):
+    """ Identidade do banco, para as chaves de cache (como `data.dataset_version`). """
+    destino = database_path(path)
+    info = os.stat(destino)
+
+    return ('sqlite', os.path.realpath(destino), info.st_ino, info.st_mtime_ns, info.st_size)
+
+def connection(path=DATA_PATH):
+    """ Conexão somente leitura da thread atual; reaberta se o banco foi refeito. """
+    versao = database_version(path)
+    conexoes = getattr(_local, 'connections', None)
+    if conexoes is None:
+        conexoes = _local.connections = {}
+
+    atual = conexoes.get(versao[1])
+    if atual is None or atual[0] != versao:
+        if atual is not None:
+            atual[1].close()
+        conexao = sqlite3.connect(f'file:{quote(versao[1])}?mode=ro', uri=True, check_same_thread=False)
+        atual = conexoes[versao[1]] = (versao, conexao)
+
+    return atual[1]
+
+def query(sql, parametros=(), path=DATA_PATH, dtype=None):
+    """ Resultado da consulta. `dtype` fixa os tipos das colunas numéricas:
+    sem linhas, o sqlite3 não informa tipos e elas viriam como `object`.
+    """
+    return pd.read_sql_query(sql, connection(path), params=list(parametros), dtype=dtype)
+
+# -----------------------------------
+# Consultas
+# -----------------------------------
+def where_clause(date_cutoff=None, traffic_options=None, cities=None, not_null=()):
+    """ WHERE com os filtros da barra lateral e os parâmetros da consulta. """
+    condicoes, parametros = [], []
+    if date_cutoff is not None:
+        condicoes.append('"Order_Date" < ?')
+        parametros.append(int(epoch_days(pd.Series([date_cutoff])).iloc[0]))
+    for coluna, valores in (('Road_traffic_density', traffic_options), ('City', cities)):
+        if valores is not None:
+            condicoes.append(f'{_quote(coluna)} IN ({", ".join("?" * len(valores))})')
+            parametros.extend(valores)
+    for coluna in not_null:
+        condicoes.append(f'{_quote(coluna)} IS NOT NULL')
+
+    if not condicoes:
+        return '', parametros
+
+    return 'WHERE ' + ' AND '.join(condicoes), parametros
+
+def _measures():
+    """ Colunas das células (`orders` e as somas de `MEASURES`) em SQL e os
+    tipos delas no resultado.
+    """
+    medidas = ['COUNT(*) AS orders']
+    tipos = {'orders': 'int64'}
+    for nome, coluna in MEASURES.items():
+        medidas += [f'COUNT({_quote(coluna)}) AS {nome}_n',
+                    f'TOTAL({_quote(coluna)}) AS {nome}_sum',
+                    f'TOTAL({_quote(coluna)} * {_quote(coluna)}) AS {nome}_sum_sq']
+        tipos.update({f'{nome}_n': 'int64', f'{nome}_sum': 'float64', f'{nome}_sum_sq': 'float64'})
+
+    return medidas, tipos
+
+def summarize_sql(keys, date_cutoff=None, traffic_options=None, cities=None, path=DATA_PATH):
+    """ O mesmo que `aggregates.summarize` sobre as linhas filtradas, em um
+    GROUP BY no banco.
+    """
+    medidas, tipos = _measures()
+    colunas = ', '.join(_quote(chave) for chave in keys)
+    where, parametros = where_clause(date_cutoff, traffic_options, cities, not_null=keys)
+    celulas = query(f'SELECT {colunas}, {", ".join(medidas)} FROM {TABLE} {where} '
+                    f'GROUP BY {colunas} ORDER BY {colunas}', parametros, path, dtype=tipos)
+
+    return _from_days(celulas).set_index(keys)
+
+def courier_sums_sql(date_cutoff=None, traffic_options=None, cities=None, path=DATA_PATH):
+    """ Somas por entregador para `courier_table.profile_from_sums`: um
+    GROUP BY por entregador e veículo e outro por entregador, com o veículo
+    de mais pedidos escolhido por uma função de janela (empates na ordem
+    do veículo). Uma linha por entregador, na ordem do ID.
+    """
+    medidas, tipos = _measures()
+    nomes = list(tipos)
+    where, parametros = where_clause(date_cutoff, traffic_options, cities,
+                                     not_null=['Delivery_person_ID', 'Type_of_vehicle'])
+    somas = query(f'''
+        WITH por_veiculo AS (
+            SELECT "Delivery_person_ID", "Type_of_vehicle", {", ".join(medidas)}
+            FROM {TABLE} {where}
+            GROUP BY "Delivery_person_ID", "Type_of_vehicle"
+        ), posicoes AS (
+            SELECT *, ROW_NUMBER() OVER (PARTITION BY "Delivery_person_ID"
+                                         ORDER BY orders DESC, "Type_of_vehicle") AS posicao
+            FROM por_veiculo
+        )
+        SELECT "Delivery_person_ID", {", ".join(f'SUM({nome}) AS {nome}' for nome in nomes)},
+               MAX(CASE WHEN posicao = 1 THEN "Type_of_vehicle" END) AS "Type_of_vehicle"
+        FROM posicoes
+        GROUP BY "Delivery_person_ID"
+        ORDER BY "Delivery_person_ID"
+    ''', parametros, path, dtype=tipos)
+
+    return somas
+
+def distinct_sql(column='Delivery_person_ID', keys=('Order_Date', 'City', 'Road_traffic_density'),
+                 date_cutoff=None, traffic_options=None, cities=None, path=DATA_PATH):
+    """ Esboço de distintos (ver `distinct.build_distinct`) montado sobre as
+    combinações distintas de células e valores, não sobre as linhas.
+    """
+    keys = list(keys)
+    colunas = ', '.join(_quote(chave) for chave in keys + [column])
+    where, parametros = where_clause(date_cutoff, traffic_options, cities, not_null=keys + [column])
+    df_aux = query(f'SELECT DISTINCT {colunas} FROM {TABLE} {where}', parametros, path)
+
+    return build_distinct(_from_days(df_aux), column, keys)
+
+def quantiles_sql(name, date_cutoff=None, traffic_options=None, cities=None, path=DATA_PATH):
+    """ Esboço de quantis `name` (ver `quantiles.build_sketch`) a partir das
+    contagens por célula e faixa, agrupadas no banco.
+
+    As faixas de largura fixa (coordenadas) são calculadas na consulta; as
+    geométricas precisam de logaritmo, que o sqlite nem sempre tem, então
+    a consulta conta por valor (o tempo tem poucos valores distintos) e as
+    faixas saem de `value_bins`.
+
+    A data só filtra: as células vêm somadas em `Order_Date`, como os
+    `totals` da `SqliteView`, então o resultado não cresce com os dias.
+    """
+    column, keys, kind, param = SKETCHES[name]
+    where, parametros = where_clause(date_cutoff, traffic_options, cities, not_null=keys + [column])
+    keys = [chave for chave in keys if chave != 'Order_Date']
+
+    if kind == 'linear':
+        colunas = ', '.join(_quote(chave) for chave in keys)
+        faixa = _floor(f'{_quote(column)} / {float(param)!r}')
+        celulas = query(f'SELECT {colunas}, {faixa} AS bin, COUNT(*) AS count FROM {TABLE} {where} '
+                        f'GROUP BY {colunas}, bin ORDER BY {colunas}, bin', parametros, path,
+                        dtype={'bin': 'int32', 'count': 'int64'})
+
+        return {'cells': _from_days(celulas).set_index(keys + ['bin']), 'kind': kind, 'param': param}
+
+    colunas = ', '.join(_quote(chave) for chave in keys + [column])
+    df_aux = _from_days(query(f'SELECT {colunas}, COUNT(*) AS count FROM {TABLE} {where} GROUP BY {colunas}',
+                              parametros, path, dtype={column: 'float64', 'count': 'int64'}))
+
+    df_aux['bin'] = value_bins(df_aux[column].to_numpy(dtype=np.float64), kind, param)
+    celulas = df_aux.groupby(keys + ['bin'])[['count']].sum()
+
+    return {'cells': celulas, 'kind': kind, 'param': param}
+
+def top_delivers_sql(k=10, metric='max', groups=None, date_cutoff=None, traffic_options=None, cities=None,
+                     path=DATA_PATH):
+    """ O mesmo que `charts.top_delivers`: os k entregadores mais rápidos e
+    os k mais lentos de cada cidade, ranqueados no banco.
+    """
+    valor = 'Time_taken(min)'
+    chaves = ['City', 'Delivery_person_ID']
+    where, parametros = where_clause(date_cutoff, traffic_options, cities, not_null=chaves)
+
+    # Empates na ordem do ID, como no ranking em pandas
+    df_aux = query(f'''
+        WITH {_metric_sql(metric, valor, where)}, posicoes AS (
+            SELECT *,
+                   ROW_NUMBER() OVER (PARTITION BY "City" ORDER BY valor ASC, "Delivery_person_ID") AS menor,
+                   ROW_NUMBER() OVER (PARTITION BY "City" ORDER BY valor DESC, "Delivery_person_ID") AS maior
+            FROM tempos
+        )
+        SELECT * FROM posicoes WHERE menor <= ? OR maior <= ?
+    ''', parametros + [k, k], path)
+
+    ordem = sorted(df_aux['City'].unique()) if groups is None else [g for g in groups if g in set(df_aux['City'])]
+
+    def montar(posicao):
+        df_top = df_aux.loc[df_aux[posicao] <= k, :]
+        df_top = df_top.assign(City=pd.Categorical(df_top['City'], categories=ordem)).sort_values(['City', posicao])
+        df_top = df_top.loc[:, chaves + ['valor']].rename(columns={'valor': valor})
+
+        return df_top.astype({'City': object}).reset_index(drop=True)
+
+    return montar('menor'), montar('maior')
+
+def _metric_sql(metric, valor, where):
+    """ CTE `tempos` com a métrica de `valor` por cidade e entregador.
+
+    Quantis interpolam entre os dois valores vizinhos da posição
+    q * (n - 1), como o `quantile` do pandas.
+    """
+    if metric in SQL_METRICS:
+        return f'''tempos AS (
+            SELECT "City", "Delivery_person_ID", {SQL_METRICS[metric]}({_quote(valor)}) AS valor
+            FROM {TABLE} {where}
+            GROUP BY "City", "Delivery_person_ID"
+        )'''
+
+    if metric not in QUANTILE_METRICS:
+        raise ValueError(f'métrica desconhecida: {metric}')
+
+    # posicao começa em 0; x = q * (n - 1), com n os valores não nulos
+    posicao = f'{QUANTILE_METRICS[metric]!r} * (n - 1)'
+    filtro = f'{where} AND' if where else 'WHERE'
+
+    return f'''ordenados AS (
+            SELECT "City", "Delivery_person_ID", {_quote(valor)} AS valor,
+                   ROW_NUMBER() OVER (PARTITION BY "City", "Delivery_person_ID" ORDER BY {_quote(valor)}) - 1 AS i,
+                   COUNT(*) OVER (PARTITION BY "City", "Delivery_person_ID") AS n
+            FROM {TABLE} {filtro} {_quote(valor)} IS NOT NULL
+        ), vizinhos AS (
+            SELECT "City", "Delivery_person_ID",
+                   MAX(CASE WHEN i = CAST({posicao} AS INTEGER) THEN valor END) AS abaixo,
+                   MAX(CASE WHEN i = CAST({posicao} AS INTEGER) + 1 THEN valor END) AS acima,
+                   MAX({posicao} - CAST({posicao} AS INTEGER)) AS fracao
+            FROM ordenados
+            GROUP BY "City", "Delivery_person_ID"
+        ), tempos AS (
+            SELECT "City", "Delivery_person_ID", abaixo + (COALESCE(acima, abaixo) - abaixo) * fracao AS valor
+            FROM vizinhos
+        )'''
+
+def extremes_sql(columns, date_cutoff=None, traffic_options=None, cities=None, path=DATA_PATH):
+    """ O mesmo que `DataFrame.agg(['min', 'max'])` sobre `columns` das
+    linhas filtradas, em um MIN/MAX no banco.
+    """
+    medidas = ', '.join(f'MIN({_quote(coluna)}), MAX({_quote(coluna)})' for coluna in columns)
+    where, parametros = where_clause(date_cutoff, traffic_options, cities)
+    valores = connection(path).execute(f'SELECT {medidas} FROM {TABLE} {where}', parametros).fetchone()
+
+    # Sem linhas, MIN/MAX vêm NULL; to_numeric troca por NaN
+    return pd.DataFrame([valores[0::2], valores[1::2]], index=['min', 'max'], columns=columns).apply(pd.to_numeric)
+
+def distance_sql(date_cutoff=None, traffic_options=None, cities=None, path=DATA_PATH):
+    """ O mesmo que `geo.distance_by_city`, em um GROUP BY no banco. """
+    where, parametros = where_clause(date_cutoff, traffic_options, cities, not_null=['City'])
+    celulas = query(f'SELECT "City", COUNT("distance") AS distance_n, TOTAL("distance") AS distance_sum '
+                    f'FROM {TABLE} {where} GROUP BY "City" ORDER BY "City"', parametros, path,
+                    dtype={'distance_n': 'int64', 'distance_sum': 'float64'})
+
+    return celulas.set_index('City')
+
+def _floor(expressao):
+    # floor() só existe com as funções matemáticas do sqlite compiladas;
+    # o CAST trunca em direção a zero e a comparação corrige os negativos
+    return f'(CAST({expressao} AS INTEGER) - ({expressao} < CAST({expressao} AS INTEGER)))'
+
+def location_cells_sql(cell_deg, date_cutoff=None, traffic_options=None, cities=None, path=DATA_PATH):
+    """ O mesmo que `geo.bin_locations` sobre os locais de entrega das
+    linhas filtradas, contado no banco.
+    """
+    lat, lon = 'Delivery_location_latitude', 'Delivery_location_longitude'
+    where, parametros = where_clause(date_cutoff, traffic_options, cities, not_null=[lat, lon])
+    linha, coluna = (_floor(f'{_quote(nome)} / {float(cell_deg)!r}') for nome in (lat, lon))
+    celulas = query(f'SELECT {linha} AS linha, {coluna} AS coluna, COUNT(*) AS orders FROM {TABLE} {where} '
+                    'GROUP BY linha, coluna ORDER BY orders DESC', parametros, path,
+                    dtype={'linha': 'int64', 'coluna': 'int64', 'orders': 'int64'})
+    celulas['lat'] = (celulas['linha'] + 0.5) * cell_deg
+    celulas['lon'] = (celulas['coluna'] + 0.5) * cell_deg
+
+    return celulas.loc[:, ['lat', 'lon', 'orders']]
+
+def rows_sql(date_cutoff=None, traffic_options=None, cities=None, path=DATA_PATH):
+    """ Linhas filtradas, nos tipos compactos e em ordem de data. """
+    where, parametros = where_clause(date_cutoff, traffic_options, cities)
+    df1 = _from_days(query(f'SELECT * FROM {TABLE} {where} ORDER BY "Order_Date", rowid', parametros, path))
+    for coluna in CLOCK_COLUMNS:
+        df1[coluna] = df1[coluna].astype('Int16')
+    df1 = df1.astype(DERIVED_TYPES)
+
+    return compact_types(df1)
+
+def cities_sql(path=DATA_PATH):
+    return query(f'SELECT DISTINCT "City" FROM {TABLE} WHERE "City" IS NOT NULL ORDER BY "City"',
+                 path=path)['City'].tolist()
+
+if __name__ == '__main__':
+    caminho = sys.argv[1] if len(sys.argv) > 1 else DATA_PATH
+    linhas = build_database(caminho)
+    print(f'{database_path(caminho)}: {linhas} linhas')
@@ -0,0 +1,57 @@
+""" Ingestão em pedaços para arquivos de pedidos maiores que a memória.
+
+Uso:
+    python -m curry_company.streaming [caminho_do_csv] [--chunksize N]
+
+O csv é lido em pedaços de `chunksize` linhas; cada pedaço passa pelo
+`clean_code` e é reduzido às células de `curry_company.aggregates`, que
+vão sendo somadas às do pedaço anterior. O pico de memória depende do
+tamanho do pedaço e da quantidade de células, não do tamanho do arquivo.
+"""
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import argparse
+
+import pandas as pd
+
+from curry_company.aggregates import DIMENSIONS, measure_stats, merge_cells, order_counts, summarize
+from curry_company.cleaning import clean_code
+from curry_company.data import DATA_PATH
+
+CHUNKSIZE = 100_000
+
+# -----------------------------------
+# Funções
+# -----------------------------------
+def iter_clean_chunks(path=DATA_PATH, chunksize=CHUNKSIZE):
+    """ Lê o csv em pedaços e devolve cada pedaço já limpo. """
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        yield clean_code(chunk)
+
+def stream_aggregates(path=DATA_PATH, chunksize=CHUNKSIZE, keys=DIMENSIONS):
+    """ Agregados do arquivo inteiro sem nunca materializar todas as linhas.
+
+    Output: células indexadas por `keys` (ver `aggregates.summarize`)
+    """
+    celulas = None
+    for chunk in iter_clean_chunks(path, chunksize):
+        celulas = merge_cells(celulas, summarize(chunk, keys))
+
+    return celulas
+
+def main():
+    parser = argparse.ArgumentParser(description='Agregados do csv lidos em pedaços')
+    parser.add_argument('path', nargs='?', default=DATA_PATH)
+    parser.add_argument('--chunksize', type=int, default=CHUNKSIZE)
+    args = parser.parse_args()
+
+    celulas = stream_aggregates(args.path, args.chunksize)
+
+    print(f"{int(celulas['orders'].sum())} pedidos em {len(celulas)} células")
+    print(order_counts(celulas, ['Festival']).to_string(index=False))
+    print(measure_stats(celulas, ['Festival'], 'time').round(2).to_string())
+    print(measure_stats(celulas, ['City'], 'time').round(2).to_string())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+""" Abas calculadas sob demanda.
+
+`st.tabs` executa o corpo de todas as abas em todo rerun, mesmo as que
+o usuário não está vendo. `lazy_tabs` mostra os rótulos como uma barra de
+opções e devolve só a aba aberta, então a página calcula e desenha apenas
+essa aba. `tab_results` calcula as seções da aba em paralelo na primeira
+vez que ela é aberta com um estado de filtros e guarda o resultado no
+cache de gráficos; voltar para a aba com os mesmos filtros não recalcula.
+"""
+# -----------------------------------
+# Importar bibliotecas
+# -----------------------------------
+import streamlit as st
+
+from curry_company.executor import evaluate
+from curry_company.figure_cache import cached_figure
+
+# -----------------------------------
+# Funções
+# -----------------------------------
+def lazy_tabs(labels, key):
+    """ Barra de abas em que só a aba escolhida é executada.
+
+    Input:
+        - labels: rótulos das abas (podem se repetir, como os '_')
+        - key: chave do widget, única na página
+    Output: rótulo da aba aberta
+    """
+    aberta = st.radio('Aba', range(len(labels)), format_func=labels.__getitem__, key=key,
+                      horizontal=True, label_visibility='collapsed')
+
+    return labels[aberta]
+
+def tab_results(page, tab, key, tasks):
+    """ Resultados das seções de uma aba, memoizados por página, aba e filtros.
+
+    Input:
+        - page: nome da página (as páginas repetem rótulos de aba, como
+          'Visão Gerencial')
+        - tab: rótulo da aba
+        - key: estado dos filtros (ver `figure_cache.filter_key`)
+        - tasks: dict nome -> função sem argumentos, como em `executor.evaluate`
+    Output: dict nome -> resultado
+    """
+    return cached_figure(f'tab:{page}:{tab}', key, evaluate, tasks)